@@ -1,5 +1,43 @@
-from .script_parsing import parse
-from typing import Any, Self
+from .script_parsing import parse, parseValue, valueRange, isDeterministic, scriptTargets
+from .dummy import dummyClassifyAbility
+from typing import Any, Callable, Optional, Self
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# How many times an amount that can't be worked out at load is sampled when it is random.
+OPAQUE_SAMPLES: int = 8
+
+
+class HPChange:
+    def __init__(self, target: int, respect_cap: bool, amount: Callable[[list[Any]], Any], amount_range: Optional[tuple[float, float, float]], samples: int):
+        self.target: int = target
+        self.respect_cap: bool = respect_cap
+        self.amount: Callable[[list[Any]], Any] = amount
+        self.amount_range: Optional[tuple[float, float, float]] = amount_range
+        self.samples: int = samples
+
+    def expectedAmount(self, targets: list[Any]) -> float:
+        """Get the expected amount, sampling it with the targets if it wasn't worked out at load.
+        """
+        if self.amount_range is not None:
+            return self.amount_range[1]
+        return sum(self.amount(targets) for _ in range(self.samples)) / self.samples
+
+    @classmethod
+    def fromDict(cls, data: dict[str, Any]) -> Self:
+        """Make an hp change from a change_hp effect.
+        """
+        return cls(
+            data["target"],
+            data["respect_cap"],
+            parseValue(data["amount"]),
+            valueRange(data["amount"]),
+            1 if isDeterministic(data["amount"]) else OPAQUE_SAMPLES,
+        )
+
 
 class AbilityType:
     def __init__(self, game, id: str, name: str, description: str, effects, targets, requirements):
@@ -9,6 +47,83 @@ class AbilityType:
         self.effects = [parse(effect, game) for effect in effects]
         self.targets = targets
         self.requirements = [parse(requirement, game) for requirement in requirements]
+        # Requirements that only look at the consumer hold or fail for every other target alike,
+        # ones that look at no target at all, like random checks, are still run for each target.
+        consumer_only = [scriptTargets(requirement) == {0} for requirement in requirements]
+        self.consumer_requirements = [parsed for parsed, only in zip(self.requirements, consumer_only) if only]
+        self.target_requirements = [parsed for parsed, only in zip(self.requirements, consumer_only) if not only]
+        self.hp_changes: list[HPChange] = [HPChange.fromDict(effect) for effect in effects if effect["type"] == "change_hp"]
+        # The (min, expected, max) hp change of each target index, None when it depends on the targets.
+        self.hp_ranges: dict[int, Optional[tuple[float, float, float]]] = {}
+        for hp_change in self.hp_changes:
+            so_far = self.hp_ranges.get(hp_change.target, (0, 0, 0))
+            if so_far is None or hp_change.amount_range is None:
+                self.hp_ranges[hp_change.target] = None
+            else:
+                self.hp_ranges[hp_change.target] = (
+                    so_far[0] + hp_change.amount_range[0],
+                    so_far[1] + hp_change.amount_range[1],
+                    so_far[2] + hp_change.amount_range[2],
+                )
+        # Rounds the ability can't be used again for, from data it gives its consumer and requires it not to have.
+        self.cooldown: int = max((
+            effect["decay"] for effect in effects
+            if effect["type"] == "add_data" and effect["target"] == 0 and isinstance(effect["decay"], int) and effect["decay"] >= 0
+            and any(
+                requirement["type"] == "check_data" and not requirement["present"] and requirement["target"] == 0 and requirement["data"] == effect["data"]
+                for requirement in requirements
+            )
+        ), default=0)
+        # One of self_heal, other_heal, other_damage or utility.
+        self.category: str = self.__classify(game)
+
+    def __classify(self, game) -> str:
+        """Classify the ability from its hp ranges, trying it on dummies when they depend on the targets.
+        """
+        if "consumer" not in self.targets:
+            return "utility"
+        if "creature" not in self.targets:
+            return "self_heal"
+        creature = self.targets.index("creature")
+        if creature not in self.hp_ranges:
+            return "utility"
+        hp_range = self.hp_ranges[creature]
+        if hp_range is None:
+            return dummyClassifyAbility(game, self)
+        if hp_range[1] > 0:
+            return "other_heal"
+        elif hp_range[1] < 0:
+            return "other_damage"
+        return "utility"
+
+    def expectedHPChange(self, targets: list[Any], target: int) -> float:
+        """Get the expected change of a target's hp if the ability were applied, respecting its hp and cap.
+        """
+        creature = targets[target]
+        hp = creature.hp
+        for hp_change in self.hp_changes:
+            if hp_change.target == target:
+                pre_hp = max(hp, creature.max_hp)
+                hp = max(hp + hp_change.expectedAmount(targets), 0)
+                if hp_change.respect_cap:
+                    hp = min(hp, pre_hp)
+        return hp - creature.hp
+
+    def expectedHPChanges(self, consumer: Any, creatures: list[Any], hp: Any, max_hp: Any, target: int = 1) -> Any:
+        """Get expectedHPChange for many creatures at once as a NumPy array, each as the target with the consumer.
+
+        hp and max_hp are the creatures' as NumPy arrays, NumPy has to be installed.
+        """
+        hp_changes = [hp_change for hp_change in self.hp_changes if hp_change.target == target]
+        if any(hp_change.amount_range is None for hp_change in hp_changes):
+            return numpy.fromiter((self.expectedHPChange([consumer, creature], target) for creature in creatures), dtype=numpy.float64, count=len(creatures))
+        new_hp = hp
+        for hp_change in hp_changes:
+            pre_hp = numpy.maximum(new_hp, max_hp)
+            new_hp = numpy.maximum(new_hp + hp_change.amount_range[1], 0)
+            if hp_change.respect_cap:
+                new_hp = numpy.minimum(new_hp, pre_hp)
+        return new_hp - hp
 
     @classmethod
     def fromDict(cls, game, id: str, data: dict[str, Any]) -> Self:
@@ -18,6 +133,8 @@ class AbilityType:
         return ability
 
 class AbilityInstance:
+    __slots__ = ("__ability_type",)
+
     def __init__(self, ability_type: AbilityType):
         self.__ability_type: AbilityType = ability_type
     
@@ -40,6 +157,24 @@ class AbilityInstance:
             
         return True
     
+    def consumerCanApply(self, consumer: Any, target_count: int) -> bool:
+        """Check the parts of canApply that only depend on the consumer and the number of targets.
+        """
+        if target_count != len(self.__ability_type.targets):
+            return False
+        for req in self.__ability_type.consumer_requirements:
+            if not req([consumer]):
+                return False
+        return True
+
+    def targetsCanApply(self, targets: list[Any]) -> bool:
+        """Check the rest of canApply, for targets the consumerCanApply check already passed for.
+        """
+        for req in self.__ability_type.target_requirements:
+            if not req(targets):
+                return False
+        return True
+
     def apply(self, targets: list[Any]) -> None:
         """Apply ability to targets.
         """
@@ -1,95 +1,371 @@
 from .util import longToString
-import time
+import bisect
+
+# How many rounds an off-screen battle is run for in one tick, what is left of it carries on next tick.
+AUTO_RESOLVE_ROUNDS: int = 200
 
 class BattleManager:
     def __init__(self):
         self.battles = {}
-    
+        # Battle ids come from a counter, ids already in use by older saves are skipped.
+        self.next_id = 0
+        self.room_battles = {}
+        self.entity_battles = {}
+        self.__maybe_empty = set()
+
+    def __allocateId(self):
+        """Get an unused battle id.
+        """
+        id = longToString(self.next_id)
+        while id in self.battles:
+            self.next_id += 1
+            id = longToString(self.next_id)
+        self.next_id += 1
+        return id
+
+    def __addBattle(self, battle):
+        """Add a battle and index it by its room.
+        """
+        self.battles[battle.id] = battle
+        self.room_battles.setdefault(battle.position, {})[battle.id] = None
+        self.__maybe_empty.add(battle.id)
+
     def startBattle(self, room):
         """Starts a battle in a room.
         """
-        id = longToString(time.time_ns())
-        self.battles[id] = BattleInstance(id, room)
+        id = self.__allocateId()
+        self.__addBattle(BattleInstance(id, room))
         return id
+
+    def endBattle(self, id):
+        """End a battle, everyone still in it leaves.
+        """
+        battle = self.battles[id]
+        for participant in battle.participants.copy():
+            self.leaveBattle(participant, id)
+        self.battles.pop(id)
+        room_battles = self.room_battles[battle.position]
+        room_battles.pop(id)
+        if len(room_battles) == 0:
+            self.room_battles.pop(battle.position)
     
     def joinBattle(self, entity, id):
         """Join a battle with an entity by the battles id.
         """
         if id in self.battles:
-            self.battles[id].participants.append(entity)
+            self.battles[id].addParticipant(entity)
+            self.entity_battles[entity] = id
             entity.addData("in_battle", id, -1)
 
     def leaveBattle(self, entity, id):
         """Leave the battle for an entity with the battle id.
         """
-        if id in self.battles and entity in self.battles[id].participants:
-            self.battles[id].participants.remove(entity)
+        if id in self.battles and self.battles[id].hasParticipant(entity):
+            self.battles[id].removeParticipant(entity)
+            if self.entity_battles.get(entity) == id:
+                self.entity_battles.pop(entity)
             entity.removeData("in_battle")
+            if self.battles[id].isOver():
+                self.__maybe_empty.add(id)
+
+    def battleOf(self, entity):
+        """Get the battle an entity is in, None if it isn't in one.
+        """
+        id = self.entity_battles.get(entity)
+        return self.battles[id] if id is not None else None
+
+    def battlesIn(self, position):
+        """Get the battles in the room at a position.
+        """
+        return [self.battles[id] for id in self.room_battles.get(position, {})]
     
     def updateBattles(self, game):
         """Update all battles in the game.
-        """
-        to_nuke = set()
-        for key, battle in self.battles.items():
-            battle.runUpdate()
 
-            if battle.isOver():
-                to_nuke.add(key)
+        Battles are ended once their last participant leaves, only battles that became empty
+        or never got a participant are looked at. Battles the player can't see are resolved
+        at once unless the game's auto_resolve is "turns".
+        """
+        for battle in list(self.battles.values()):
+            if battle.id not in self.battles:
+                continue
+            if game.auto_resolve != "turns" and not battle.isVisibleTo(game):
+                self.resolveBattle(battle, game)
+            else:
+                battle.runUpdate()
 
-        # TODO: Check for any invalid battles and end them.
-        for key in to_nuke:
-            self.battles.pop(key)
+        for id in self.__maybe_empty:
+            if id in self.battles and self.battles[id].isOver():
+                self.endBattle(id)
+        self.__maybe_empty.clear()
     
+    def resolveBattle(self, battle, game):
+        """Run a battle to its end with events muted and emit a battle_resolved summary instead.
+
+        With the game's auto_resolve "statistical", or in rooms far enough from the player to be
+        simulated coarsely, the outcome is estimated from the expected damage of each side, otherwise the battle's turns are run in a loop. Only the
+        participants of the battle are updated between rounds, not the rest of the room.
+        """
+        room = battle.room
+        fighters = [(participant, participant.hp) for participant in battle.participants]
+        muted = game.muted
+        game.muted = True
+        rounds = 0
+        try:
+            if game.auto_resolve == "statistical" or game.scheduler.isCoarse(battle.position, game):
+                rounds = battle.estimateOutcome(AUTO_RESOLVE_ROUNDS)
+            else:
+                while rounds < AUTO_RESOLVE_ROUNDS and not battle.isOver() and not battle.isDecided():
+                    rounds += 1
+                    room.updateEntities(battle.participants)
+                    battle.runUpdate()
+            room.updateEntities([participant for participant, _ in fighters if participant.to_die and room.hasEntity(participant)])
+        finally:
+            game.muted = muted
+        if not battle.isDecided():
+            return
+        survivors = {}
+        for participant, _ in fighters:
+            if not participant.to_die:
+                survivors[participant.faction] = survivors.get(participant.faction, 0) + 1
+        damage = sum(hp - participant.hp for participant, hp in fighters)
+        self.endBattle(battle.id)
+        game.emit("battle_resolved", "", battle=battle.id, room_x=battle.position[0], room_y=battle.position[1], rounds=rounds, survivors=survivors, damage=damage)
+
     @classmethod
     def fromDict(cls, data, game):
         """Get the state of the battle manager from a dictionary.
+
+        Battles whose room isn't in the map are dropped, rooms are never generated here. Their
+        participants drop their in_battle data when they are linked by battleLoad. Saved
+        participants join again in the order they joined, anyone left over joins in battleLoad.
         """
         battle_manager = cls()
-        battle_manager.battles = {key: BattleInstance.fromDict(value, game) for key, value in data["battles"].items()}
+        battle_manager.next_id = data.get("next_id", 0)
+        for value in data["battles"].values():
+            battle = BattleInstance.fromDict(value, game)
+            if battle is not None:
+                battle_manager.__addBattle(battle)
+                entities = battle.room.entities
+                for index in value.get("participants", []):
+                    entity = game.player if index == "player" else entities[index] if 0 <= index < len(entities) else None
+                    if entity is not None and entity.hasData("in_battle") and entity.getData("in_battle") == battle.id:
+                        battle_manager.joinBattle(entity, battle.id)
         return battle_manager
 
     def toDict(self):
         """Turn the state of the battle manager into a dictionary.
         """
         return {
-            "battles": {key: battle.toDict() for key, battle in self.battles.items()}
+            "battles": {key: battle.toDict() for key, battle in self.battles.items()},
+            "next_id": self.next_id,
         }
 
 class BattleInstance:
     def __init__(self, id, room):
         self.id = id
         self.room = room
-        self.participants = []
-    
+        self.position = (room.position_x, room.position_y)
+        # Participants in the order they joined, with a set for membership, the faction groups and
+        # the turn order all kept up to date by addParticipant and removeParticipant. Leaving only
+        # takes an entity out of members, the lists skip it once they are next read.
+        self.__participants = []
+        self.members = set()
+        self.factions = {}
+        self.__turn_order = []
+        self.__joined = {}
+        self.__joins = 0
+        self.__left = 0
+
+    @property
+    def participants(self):
+        """The entities in the battle in the order they joined.
+        """
+        if self.__left > 0:
+            self.__compact()
+        return self.__participants
+
+    @property
+    def turn_order(self):
+        """The entities in the battle fastest first, then the first to join.
+        """
+        if self.__left > 0:
+            self.__compact()
+        return self.__turn_order
+
+    def __compact(self):
+        """Drop the entities that left from the participants and the turn order in one pass each.
+        """
+        members = self.members
+        self.__participants = [participant for participant in self.__participants if participant in members]
+        self.__turn_order = [participant for participant in self.__turn_order if participant in members]
+        self.__left = 0
+
+    def __turnKey(self, entity):
+        """Fastest first, then the first to join.
+        """
+        return (-entity.speed, self.__joined[entity])
+
+    def hasParticipant(self, entity):
+        """Check if an entity is in the battle.
+        """
+        return entity in self.members
+
+    def addParticipant(self, entity):
+        """Add an entity to the battle, does nothing if it is already in it.
+        """
+        if entity in self.members:
+            return
+        if self.__left > 0:
+            self.__compact()
+        self.__participants.append(entity)
+        self.members.add(entity)
+        self.__joined[entity] = self.__joins
+        self.__joins += 1
+        self.factions.setdefault(entity.faction_id, {})[entity] = None
+        bisect.insort(self.__turn_order, entity, key=self.__turnKey)
+
+    def removeParticipant(self, entity):
+        """Remove an entity from the battle in constant time.
+        """
+        if entity not in self.members:
+            return
+        self.members.remove(entity)
+        self.__left += 1
+        for faction, group in self.factions.items():
+            if entity in group:
+                group.pop(entity)
+                if len(group) == 0:
+                    self.factions.pop(faction)
+                break
+        self.__joined.pop(entity)
+
+    def opponentsOf(self, entity):
+        """Get the participants hostile to an entity that aren't dying, in the order they joined.
+
+        Only the groups of factions the entity is hostile to are looked at.
+        """
+        hostility = entity.game.faction_table.hostility[entity.faction_id]
+        if hostility == 0:
+            return []
+        opponents = []
+        groups = 0
+        for faction_id, group in self.factions.items():
+            if (hostility >> faction_id) & 1:
+                opponents.extend(participant for participant in group if not participant.to_die)
+                groups += 1
+        if groups > 1:
+            opponents.sort(key=self.__joined.__getitem__)
+        return opponents
+
+    def isVisibleTo(self, game):
+        """Check if the player is in the battle or in its room.
+        """
+        return self.hasParticipant(game.player) or self.position == (game.player_x, game.player_y)
+
+    def isDecided(self):
+        """Check if nobody left in the battle is hostile to anyone else left.
+        """
+        if len(self.members) == 0:
+            return True
+        hostility = self.participants[0].game.faction_table.hostility
+        factions = [faction_id for faction_id, group in self.factions.items() if any(not participant.to_die for participant in group)]
+        return not any((hostility[faction_id] >> other) & 1 for faction_id in factions for other in factions)
+
+    def estimateOutcome(self, max_rounds):
+        """Play the battle out between faction groups instead of participants and return the rounds it took.
+
+        Each round a group deals the expected damage of its members' best damaging action,
+        split between the groups hostile to it by their hp. Damage to a group is taken by its
+        members in the order they joined. Cooldowns and healing are not taken into account.
+        """
+        if len(self.participants) == 0:
+            return 0
+        hostility = self.participants[0].game.faction_table.hostility
+        damage_per_round = {participant: expectedDamage(participant) for participant in self.participants}
+        rounds = 0
+        while rounds < max_rounds and not self.isDecided():
+            rounds += 1
+            alive = {faction_id: [participant for participant in group if not participant.to_die] for faction_id, group in self.factions.items()}
+            group_hp = {faction_id: sum(participant.hp for participant in group) for faction_id, group in alive.items()}
+            taken = dict.fromkeys(alive, 0.0)
+            for faction_id, group in alive.items():
+                dealt = sum(damage_per_round[participant] for participant in group)
+                targets = [other for other in alive if (hostility[faction_id] >> other) & 1 and group_hp[other] > 0]
+                total_hp = sum(group_hp[other] for other in targets)
+                for other in targets:
+                    taken[other] += dealt * group_hp[other] / total_hp
+            if not any(amount > 0 for amount in taken.values()):
+                break
+            for faction_id, amount in taken.items():
+                amount = round(amount)
+                for participant in alive[faction_id]:
+                    if amount <= 0:
+                        break
+                    hit = min(amount, participant.hp)
+                    participant.changeHP(-hit, True)
+                    amount -= hit
+        return rounds
+
     def runUpdate(self):
-        """Run the update for the battle.
-        """
-        def idk(entity):
-            """I just needed a wrapper for this since I couldn't use lambdas. This returns the speed of an entity.
-            """
-            return entity.speed
-        organized_participants = sorted(self.participants, key=idk, reverse=True)
-        for participant in organized_participants:
-            if participant in self.participants:
-                participant.battleUpdate(self, [participant_thing for participant_thing in self.participants if not participant_thing is participant])
+        """Run the update for the battle, fastest participants first.
+
+        Speeds can change during a battle, so the turn order is checked and sorted again from
+        the join order if one has. Everyone is given the participants as they were when the
+        round started, themselves included, so entities leaving during the round don't make
+        the lists be rebuilt each turn.
+        """
+        order = self.turn_order
+        participants = self.participants
+        if any(order[i].speed < order[i + 1].speed for i in range(len(order) - 1)):
+            store = order[0].game.entity_store
+            order = self.__turn_order = store.orderBySpeed(participants) if store is not None else sorted(participants, key=lambda participant: -participant.speed)
+        for participant in order.copy():
+            if participant in self.members:
+                participant.battleUpdate(self, participants)
     
     def isOver(self):
         """Returns if the battle is over.
         """
-        return len(self.participants) == 0
+        return len(self.members) == 0
     
     @classmethod
     def fromDict(cls, data, game):
-        """Create a battle from a dictionary.
+        """Create a battle from a dictionary, None if its room isn't in the map.
         """
-        battle = cls(data["id"], game.map.getRoom(data["room_x"], data["room_y"]))
+        room = game.map.getRooms().get((data["room_x"], data["room_y"]))
+        if room is None:
+            return None
+        battle = cls(data["id"], room[0])
         return battle
     
     def toDict(self):
         """Turns a battle into a dictionary.
+
+        Participants are saved in the order they joined, as "player" or their place in the room.
         """
+        indexes = {entity: i for i, entity in enumerate(self.room.iterEntities())}
         return {
             "id": self.id,
-            "room_x": self.room.position_x,
-            "room_y": self.room.position_y
+            "room_x": self.position[0],
+            "room_y": self.position[1],
+            "participants": [
+                "player" if participant is participant.game.player else indexes[participant]
+                for participant in self.participants
+                if participant is participant.game.player or participant in indexes
+            ],
         }
+
+
+def expectedDamage(entity):
+    """Get the expected damage per round of an entity's best damaging action, for ones that can be
+    worked out without targets, spread over their cooldown.
+    """
+    best = 0
+    for action in entity.actions:
+        ability_type = action.getType()
+        if ability_type.category == "other_damage":
+            hp_range = ability_type.hp_ranges.get(ability_type.targets.index("creature"))
+            if hp_range is not None:
+                best = max(best, -hp_range[1] / (ability_type.cooldown + 1))
+    return best
@@ -0,0 +1,220 @@
+from .simulation import SimulationEngine, BotEngine, POLICIES
+from .entity import EntityInstance
+from .battle import BattleManager
+from .script_parsing import parseEntityEntry
+from .map.RoomInstance import RoomInstance
+from typing import Any, Optional
+import argparse, gc, json, math, random, time, tracemalloc
+
+
+def generateMap(engine: SimulationEngine, rooms: int, seed: int = 0) -> None:
+    """Fill a square of the map with rooms from random room pools.
+    """
+    random.seed(seed)
+    room_pools = list(engine.map.room_pool_types)
+    side = math.ceil(math.sqrt(rooms))
+    for i in range(rooms):
+        engine.map.setRoom(i % side, i // side, random.choice(room_pools))
+
+
+def measureMemory(rooms: int = 100000, entity_samples: int = 10000, seed: int = 0, mods_path: str = "mods", active_mods: Optional[list[str]] = None) -> dict[str, Any]:
+    """Measure the traced bytes held per room and per entity of a generated map.
+
+    Rooms are measured with everything in them. Entities are measured on their own by
+    loading copies of entities saved from the map, so only what an entity holds is counted.
+    """
+    engine = SimulationEngine(mods_path, active_mods=active_mods)
+    engine.map.reset()
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    generateMap(engine, rooms, seed)
+    gc.collect()
+    room_bytes = tracemalloc.get_traced_memory()[0] - start
+    entity_count = sum(room.entityCount() for room, _ in engine.map.getRooms().values())
+
+    saved = [entity.toDict() for room, _ in engine.map.getRooms().values() for entity in room.iterEntities()]
+    entity_bytes = 0
+    if len(saved) > 0:
+        gc.collect()
+        start = tracemalloc.get_traced_memory()[0]
+        entities = [EntityInstance.fromDict(saved[i % len(saved)], engine) for i in range(entity_samples)]
+        gc.collect()
+        entity_bytes = tracemalloc.get_traced_memory()[0] - start
+        del entities
+    tracemalloc.stop()
+
+    return {
+        "rooms": rooms,
+        "entities": entity_count,
+        "bytes": room_bytes,
+        "bytes_per_room": room_bytes / rooms,
+        "bytes_per_entity": entity_bytes / entity_samples if len(saved) > 0 else 0,
+    }
+
+
+def measureSpawning(rooms: int = 20000, seed: int = 0, mods_path: str = "mods", active_mods: Optional[list[str]] = None) -> dict[str, Any]:
+    """Time applying every spawn pool to fresh rooms.
+    """
+    engine = SimulationEngine(mods_path, active_mods=active_mods)
+    random.seed(seed)
+    room_type = next(iter(engine.map.room_types.values()))
+    spawned = 0
+    start = time.perf_counter()
+    for spawn_pool in engine.map.spawn_pool_types.values():
+        for _ in range(rooms):
+            room = RoomInstance(room_type)
+            spawn_pool.applyTo(room)
+            spawned += room.entityCount()
+    seconds = time.perf_counter() - start
+    return {
+        "rooms": rooms * len(engine.map.spawn_pool_types),
+        "entities": spawned,
+        "seconds": seconds,
+        "entities_per_second": spawned / seconds if seconds > 0 else 0,
+    }
+
+
+def measureTicks(rooms: int = 10000, ticks: int = 1000, seed: int = 0, detail_radius: Optional[int] = None, mods_path: str = "mods", active_mods: Optional[list[str]] = None) -> dict[str, Any]:
+    """Time world ticks with the player standing in the middle of a generated map.
+
+    Every generated room wakes on the first tick, which is timed on its own. detail_radius
+    overrides the scheduler's, a radius as big as the map simulates every room in full.
+    """
+    engine = SimulationEngine(mods_path, active_mods=active_mods)
+    if detail_radius is not None:
+        engine.scheduler.detail_radius = detail_radius
+    generateMap(engine, rooms, seed)
+    side = math.ceil(math.sqrt(rooms))
+    engine.player_x = engine.player_y = side // 2
+    engine.player.hp = engine.player.max_hp = 10 ** 9
+    random.seed(seed)
+    start = time.perf_counter()
+    engine.tick()
+    first_tick_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(ticks - 1):
+        engine.tick()
+    seconds = time.perf_counter() - start
+    return {
+        "rooms": rooms,
+        "ticks": ticks,
+        "first_tick_seconds": first_tick_seconds,
+        "seconds_per_tick": seconds / max(ticks - 1, 1),
+    }
+
+
+def measureBattle(sides: list[list[dict[str, Any]]], copies: int = 100, ticks: int = 5, seed: int = 0, room_type: Optional[str] = None, mods_path: str = "mods", active_mods: Optional[list[str]] = None) -> dict[str, Any]:
+    """Time the first ticks of one battle where every entity entry of the sides joins copies times.
+    """
+    engine = SimulationEngine(mods_path, active_mods=active_mods)
+    random.seed(seed)
+    engine.battle_manager = BattleManager()
+    room = RoomInstance(engine.map.room_types[room_type or next(iter(engine.map.room_types))])
+    battle_id = engine.battle_manager.startBattle(room)
+    for side in sides:
+        for entry in side:
+            for entity in parseEntityEntry(entry, engine)[2](copies):
+                room.addEntity(entity)
+                engine.battle_manager.joinBattle(entity, battle_id)
+    participants = len(engine.battle_manager.battles[battle_id].participants)
+
+    tick_seconds: list[float] = []
+    while len(tick_seconds) < ticks and battle_id in engine.battle_manager.battles:
+        start = time.perf_counter()
+        room.update()
+        engine.battle_manager.updateBattles(engine)
+        tick_seconds.append(time.perf_counter() - start)
+    return {
+        "participants": participants,
+        "ticks": len(tick_seconds),
+        "seconds_per_tick": sum(tick_seconds) / len(tick_seconds) if len(tick_seconds) > 0 else 0,
+    }
+
+
+def measurePooling(config: dict[str, Any], runs: int = 20, seed: int = 0, mods_path: str = "mods") -> dict[str, Any]:
+    """Time the same seeded bot runs without and with object pooling, counting garbage collections.
+
+    The runs are played in one process so the pools last across them like in a worker.
+    """
+    policy = config.get("policy", {"type": "explorer"})
+    report: dict[str, Any] = {"runs": runs}
+    records: list[list[dict[str, Any]]] = []
+    for pooling in (False, True):
+        engine = BotEngine(mods_path, config.get("mods"), POLICIES[policy["type"]](policy), pooling)
+        gc.collect()
+        collections = [generation["collections"] for generation in gc.get_stats()]
+        start = time.perf_counter()
+        records.append([engine.runOnce(seed + i, config) for i in range(runs)])
+        seconds = time.perf_counter() - start
+        result: dict[str, Any] = {
+            "seconds": seconds,
+            "gc_collections": [generation["collections"] - before for generation, before in zip(gc.get_stats(), collections)],
+        }
+        if engine.pools is not None:
+            result["pools"] = engine.pools.stats()
+        report["pooled" if pooling else "unpooled"] = result
+    report["same_records"] = records[0] == records[1]
+    return report
+
+
+def main() -> None:
+    """Command line entry.
+
+    python -m src.benchmark memory measures the bytes held by a generated map.
+
+    python -m src.benchmark spawn times spawning entities through the spawn pools.
+
+    python -m src.benchmark tick times world ticks on a generated map.
+
+    python -m src.benchmark battle <spec.json> times ticks of one big battle, the spec is
+    the same as for python -m src.simulation battle.
+
+    python -m src.benchmark pool [config.json] plays bot runs without and with object pooling,
+    the config is the same as for python -m src.simulation runs.
+    """
+    parser = argparse.ArgumentParser(description="Measure the engine.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    memory_parser = subparsers.add_parser("memory", help="Traced bytes per room and per entity of a generated map.")
+    memory_parser.add_argument("--rooms", type=int, default=100000)
+    memory_parser.add_argument("--entities", type=int, default=10000)
+    memory_parser.add_argument("--seed", type=int, default=0)
+    spawn_parser = subparsers.add_parser("spawn", help="Entities spawned per second through the spawn pools.")
+    spawn_parser.add_argument("--rooms", type=int, default=20000)
+    spawn_parser.add_argument("--seed", type=int, default=0)
+    tick_parser = subparsers.add_parser("tick", help="Seconds per world tick on a generated map.")
+    tick_parser.add_argument("--rooms", type=int, default=10000)
+    tick_parser.add_argument("--ticks", type=int, default=1000)
+    tick_parser.add_argument("--seed", type=int, default=0)
+    tick_parser.add_argument("--detail-radius", type=int, default=None)
+    battle_parser = subparsers.add_parser("battle", help="Seconds per tick of one big battle.")
+    battle_parser.add_argument("spec")
+    battle_parser.add_argument("--copies", type=int, default=100)
+    battle_parser.add_argument("--ticks", type=int, default=5)
+    battle_parser.add_argument("--seed", type=int, default=0)
+    pool_parser = subparsers.add_parser("pool", help="Bot runs without and with object pooling.")
+    pool_parser.add_argument("config", nargs="?", default=None)
+    pool_parser.add_argument("--runs", type=int, default=20)
+    pool_parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    if arguments.mode == "memory":
+        print(json.dumps(measureMemory(arguments.rooms, arguments.entities, arguments.seed), indent=2))
+    elif arguments.mode == "spawn":
+        print(json.dumps(measureSpawning(arguments.rooms, arguments.seed), indent=2))
+    elif arguments.mode == "tick":
+        print(json.dumps(measureTicks(arguments.rooms, arguments.ticks, arguments.seed, arguments.detail_radius), indent=2))
+    elif arguments.mode == "battle":
+        with open(arguments.spec, "r") as f:
+            spec = json.load(f)
+        print(json.dumps(measureBattle(spec["sides"], arguments.copies, arguments.ticks, arguments.seed, spec.get("room"), active_mods=spec.get("mods")), indent=2))
+    elif arguments.mode == "pool":
+        config: dict[str, Any] = {}
+        if arguments.config is not None:
+            with open(arguments.config, "r") as f:
+                config = json.load(f)
+        print(json.dumps(measurePooling(config, arguments.runs, arguments.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,11 @@
-from .script_parsing import parse
+from .script_parsing import parse, isDeterministic
 
 class LevelDetail:
     def __init__(self, game, xp_cost, features, abilities):
         self.xp_cost = xp_cost
         self.features = [parse(feature_data, game) for feature_data in features]
         self.abilities = abilities
+        self.deterministic: bool = isDeterministic(features)
     
     def applyTo(self, apply_to, ability_types):
         """Apply level details to an entity.
@@ -50,6 +51,8 @@ class ClassType:
         return class_type
     
 class ClassInstance:
+    __slots__ = ("__class_type", "level")
+
     def __init__(self, class_type, level):
         self.__class_type = class_type
         self.level = level
@@ -1,6 +1,16 @@
-from .item import ItemInstance
-from .dummy import dummyFindActionType, dummyTestSelfHeal, dummyTestHurt
-from typing import Optional
+from .item import ItemInstance, ItemType
+from typing import Any, Optional, cast
+import copy, heapq
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Below this many opponents plain Python scores targets faster than NumPy.
+VECTORIZE_AT: int = 32
+# The hooks an entity calls on its components, in the order of its dispatch table.
+HOOKS: tuple[str, ...] = ("update", "battle", "death")
 
 # Tada, inheritance.
 # Technically.
@@ -15,7 +25,7 @@ class Component:
         pass
 
     def battle(self, battle, entity, participants):
-        """Battle update virtual function.
+        """Battle update virtual function, participants are everyone in the battle including the entity.
         """
         pass
 
@@ -33,27 +43,136 @@ class Component:
         """To dict virtual function."""
         return {}
 
+    def clone(self, pools=None):
+        """Copy the component for another entity, shallow unless overridden, pools are the game's ObjectPools or None."""
+        return copy.copy(self)
+
+    def hooks(self) -> tuple[bool, ...]:
+        """Get which of HOOKS the component overrides, entities only call those.
+        """
+        return tuple(getattr(type(self), hook) is not getattr(Component, hook) for hook in HOOKS)
+
+
+class DispatchTable:
+    """Where an entity's components are, by hook and by class.
+
+    hooks holds the indexes of the components that have each of HOOKS, in HOOKS order.
+    by_class maps each class a component is an instance of to the indexes of those components.
+    """
+    __slots__ = ("hooks", "by_class")
+
+    def __init__(self, key: tuple[tuple[type, tuple[bool, ...]], ...]):
+        self.hooks: tuple[tuple[int, ...], ...] = tuple(
+            tuple(i for i, (_, hooks) in enumerate(key) if hooks[hook]) for hook in range(len(HOOKS))
+        )
+        by_class: dict[type, list[int]] = {}
+        for i, (component_class, _) in enumerate(key):
+            for base in component_class.__mro__[:-1]:
+                by_class.setdefault(base, []).append(i)
+        self.by_class: dict[type, tuple[int, ...]] = {base: tuple(indexes) for base, indexes in by_class.items()}
+
+
+# The class and hooks of each component in a list -> the dispatch table for them, shared by
+# every entity with the same kinds of components.
+dispatch_tables: dict[tuple[tuple[type, tuple[bool, ...]], ...], DispatchTable] = {}
+
+
+def dispatchTable(components) -> DispatchTable:
+    """Get the dispatch table for a list of components, components that failed to load are skipped.
+    """
+    key = tuple(
+        (type(component), component.hooks()) if component is not None else (object, (False,) * len(HOOKS))
+        for component in components
+    )
+    table = dispatch_tables.get(key)
+    if table is None:
+        table = DispatchTable(key)
+        dispatch_tables[key] = table
+    return table
+
 
 class FunctionHolder(Component):
     def __init__(self, update, battle):
         self.update_callback = update
         self.battle_callback = battle
+
+    def clone(self, pools=None):
+        """Copy the FunctionHolder, the callbacks are shared.
+        """
+        return FunctionHolder(self.update_callback, self.battle_callback)
     
+    def hooks(self) -> tuple[bool, ...]:
+        """Only the callbacks the FunctionHolder was made with are hooks, so it is never called with a None one.
+        """
+        return (self.update_callback is not None, self.battle_callback is not None, False)
+
     def update(self, room, entity):
         """Handle the game update for the FunctionHolder component.
         """
-        if self.update_callback != None:
-            self.update_callback()
+        self.update_callback()
     
     def battle(self, battle, entity, participants):
         """Handle battle update for the FunctionHolder component.
         """
-        if self.battle_callback != None:
-            self.battle_callback()
+        self.battle_callback()
 
 class Inventory(Component):
+    """Slots of item stacks.
+    """
     def __init__(self, size):
         self.items: list[Optional[ItemInstance]] = [None for _ in range(size)]
+        # Both None until the first item is added.
+        self.__free: Optional[list[int]] = None
+        self.__partial: Optional[dict[ItemType, list[int]]] = None
+
+    def __claimItems(self) -> None:
+        """Point the items at their slots in the inventory, empty stacks are removed.
+        """
+        self.__free = None
+        self.__partial = None
+        for i, item in enumerate(self.items):
+            if item is not None:
+                if item.stack == 0:
+                    self.items[i] = None
+                else:
+                    item.inventory = self
+                    item.slot = i
+
+    def __index(self) -> list[int]:
+        """Build the heaps from the items and return the free one.
+        """
+        free: list[int] = []
+        partial: dict[ItemType, list[int]] = {}
+        for i, item in enumerate(self.items):
+            if item is None:
+                free.append(i)
+            elif item.stack < item.max_stack:
+                partial.setdefault(item.getType(), []).append(i)
+        self.__free = free
+        self.__partial = partial
+        return free
+
+    def __nextSlot(self, item_type: ItemType) -> Optional[int]:
+        """Get the lowest slot an item of a type can go in, a stack of it that isn't full or a free slot.
+        """
+        items = self.items
+        free = self.__free if self.__free is not None else self.__index()
+        partials = cast(dict[ItemType, list[int]], self.__partial)
+        partial = partials.get(item_type)
+        if partial is not None:
+            while len(partial) > 0:
+                item = items[partial[0]]
+                if item is not None and item.getType() is item_type and item.stack < item.max_stack:
+                    break
+                heapq.heappop(partial)
+            if len(partial) == 0:
+                del partials[item_type]
+                partial = None
+        while len(free) > 0 and items[free[0]] is not None:
+            heapq.heappop(free)
+        if partial is not None and (len(free) == 0 or partial[0] < free[0]):
+            return partial[0]
+        return free[0] if len(free) > 0 else None
 
     def getItem(self, index: int) -> Optional[ItemInstance]:
         """Get item from inventory.
@@ -63,14 +182,55 @@ class Inventory(Component):
     def addItem(self, itemToAdd) -> bool:
         """Adds an item to the inventory.
         """
-        for i, item in enumerate(self.items):
-            if (isinstance(item, ItemInstance) and item.getType() == itemToAdd and item.canAddStack(itemToAdd)):
-                item.changeStack(1)
-                return True
-            elif item == None:
-                self.items[i] = ItemInstance(itemToAdd)
-                return True
-        return False
+        return self.addItems(itemToAdd, 1) == 1
+
+    def addItems(self, item_type: ItemType, amount: int, pools=None) -> int:
+        """Add amount items of a type a stack at a time, filling the lowest slots first, and return how many fit.
+
+        Items go where adding them one at a time with addItem would put them, new stacks come
+        from pools when given.
+        """
+        added = 0
+        while added < amount:
+            slot = self.__nextSlot(item_type)
+            if slot is None:
+                break
+            item = self.items[slot]
+            if item is None:
+                item = ItemInstance(item_type) if pools is None else pools.make(ItemInstance, item_type)
+                item.stack = max(1, min(item.max_stack, amount - added))
+                item.inventory = self
+                item.slot = slot
+                self.items[slot] = item
+                heapq.heappop(cast(list[int], self.__free))
+                added += item.stack
+                if item.stack < item.max_stack:
+                    heapq.heappush(cast(dict[ItemType, list[int]], self.__partial).setdefault(item_type, []), slot)
+            else:
+                count = min(item.max_stack - item.stack, amount - added)
+                item.stack += count
+                added += count
+        return added
+
+    def removeItem(self, slot: int) -> Optional[ItemInstance]:
+        """Take the item out of a slot and return it.
+        """
+        item = self.items[slot]
+        if item is not None:
+            self.items[slot] = None
+            item.inventory = None
+            item.slot = -1
+            if self.__free is not None:
+                heapq.heappush(self.__free, slot)
+        return item
+
+    def stackChanged(self, item: ItemInstance, previous: int) -> None:
+        """Update the heaps for an item whose stack changed from previous, called by ItemInstance.changeStack.
+        """
+        if item.stack == 0:
+            self.removeItem(item.slot)
+        elif previous >= item.max_stack and item.stack < item.max_stack and self.__partial is not None:
+            heapq.heappush(self.__partial.setdefault(item.getType(), []), item.slot)
     
     def displayInventory(self):
         """Returns the display for the inventory.
@@ -81,22 +241,22 @@ class Inventory(Component):
                 to_return += f"{i + 1}. {item.name} - {item.description}\n"
         return to_return
     
-    def update(self, room, entity):
-        """Handle the game update for the inventory component.
-        """
-        for i in range(len(self.items)):
-            if isinstance(self.items[i], ItemInstance) and self.items[i].stack == 0:
-                self.items[i] = None
-    
     def death(self, room, entity):
-        """Handle the entity death for the inventory component."""
-        from .map import Interactable
-        for item in self.items:
+        """Handle the entity death for the inventory component, with the game's pools the items are taken out and given back once dropped."""
+        from .map.Interactable import Interactable
+        pools = entity.game.pools
+        for slot, item in enumerate(self.items):
             if isinstance(item, ItemInstance):
-                drop = Interactable(str(item), item.description, ["item"], ["get_item"], {
+                data = {
                     "item_type": item.getType().id,
                     "item_amount": item.stack
-                })
+                }
+                if pools is None:
+                    drop = Interactable(str(item), item.description, ["item"], ["get_item"], data)
+                else:
+                    drop = pools.make(Interactable, str(item), item.description, ["item"], ["get_item"], data)
+                    self.removeItem(slot)
+                    pools.give(item)
                 room.addInteractable(drop)
 
     @classmethod
@@ -108,6 +268,16 @@ class Inventory(Component):
             inventory.items = [
                 ItemInstance.fromDict(item_instance, game.item_types) if item_instance != None else None for item_instance in data["items"]
             ]
+            inventory.__claimItems()
+        return inventory
+
+    def clone(self, pools=None):
+        """Copy the inventory and the items in it, the items come from pools when given.
+        """
+        inventory = Inventory.__new__(Inventory)
+        inventory.items = [item.clone(inventory, i, pools) if item != None else None for i, item in enumerate(self.items)]
+        inventory.__free = None
+        inventory.__partial = None
         return inventory
 
     def toDict(self):
@@ -116,40 +286,67 @@ class Inventory(Component):
         return {"type": "inventory", "items": [item.toDict() if item != None else None for item in self.items]}
 
 
+def gatherHP(game, entities) -> tuple[Any, Any]:
+    """Gather the hp and max_hp of entities as NumPy arrays, read from the entity store columns when it has them all.
+    """
+    store = game.entity_store
+    columns = store.hpColumns(entities) if store is not None else None
+    if columns is not None:
+        return columns
+    return numpy.array([entity.hp for entity in entities], dtype=numpy.float64), numpy.array([entity.max_hp for entity in entities], dtype=numpy.float64)
+
+
+def scoreTargets(entity, action, opponents, hp, max_hp, section) -> tuple[int, float]:
+    """Score every opponent as the target of a damaging action at once and return the best (index, score).
+
+    The first of equal scores wins. Only the best opponents are checked against the action's
+    requirements, in order until one passes, (0, -inf) if none do.
+    """
+    if not action.consumerCanApply(entity, 2):
+        return 0, -numpy.inf
+    scores = -action.getType().expectedHPChanges(entity, opponents, hp, max_hp)
+    scores *= section["percent_of_total_hp"] / max_hp + section["percent_of_remaining_hp"] / hp
+    best = int(numpy.argmax(scores))
+    if action.targetsCanApply([entity, opponents[best]]):
+        return best, float(scores[best])
+    for i in numpy.argsort(-scores, kind="stable")[1:]:
+        if action.targetsCanApply([entity, opponents[i]]):
+            return int(i), float(scores[i])
+    return 0, -numpy.inf
+
+
 class AI(Component):
     def __init__(self, personality):
         self.personality = personality
 
+    def clone(self, pools=None):
+        """Copy the AI, the personality is shared.
+        """
+        return AI(self.personality)
+
     def update(self, room, entity):
         """Handle the game update for the AI component.
         """
-        in_battle = entity.hasData("in_battle")
-        if not in_battle:
-            entities_in_room = (set(room.entities) - {entity}) | {entity.game.player}
-            hostile = [
-                entity_room
-                for entity_room in entities_in_room
-                if entity.isHostile(entity_room)
-            ]
-            priority_target = -1
-
-            for i, hostile_creature in enumerate(hostile):
-                if hostile_creature == entity.game.player:
-                    priority_target = i
-                    break
-                else: 
-                    priority_target = i
+        battle_manager = entity.game.battle_manager
+        if battle_manager.battleOf(entity) is None:
+            game = entity.game
+            # The player isn't one of the room's entities, it is only there if it is in the room.
+            # It is the target before anything else.
+            if (room.position_x, room.position_y) == (game.player_x, game.player_y) and entity.isHostile(game.player):
+                target = game.player
+            else:
+                target = room.firstHostileTo(entity)
 
-            if priority_target > -1:
-                target = hostile[priority_target]
-                if target.hasData("in_battle"):
-                    entity.game.battle_manager.joinBattle(entity, target.getData("in_battle"))
+            if target is not None:
+                target_battle = battle_manager.battleOf(target)
+                if target_battle is not None:
+                    battle_manager.joinBattle(entity, target_battle.id)
                 else:
-                    id = entity.game.battle_manager.startBattle(room)
-                    entity.game.battle_manager.joinBattle(entity, id)
+                    id = battle_manager.startBattle(room)
+                    battle_manager.joinBattle(entity, id)
                     if target == entity.game.player:
-                        entity.game.addMenu("dungeon_combat")()
-                    entity.game.battle_manager.joinBattle(target, id)
+                        entity.game.enterCombat()
+                    battle_manager.joinBattle(target, id)
                     
         else:
             ...
@@ -158,12 +355,11 @@ class AI(Component):
         """Handle battle update for the AI component.
         """
         #print("Battle Was Called")
-        opponents = [
-            participant for participant in participants if entity.isHostile(participant) and not participant.to_die
-        ]
-        allies = list(set(participants) - set(opponents))
+        opponents = battle.opponentsOf(entity)
         if len(opponents) == 0:
             entity.flee()
+        elif "search" in self.personality and self.searchTurn(battle, entity):
+            return
         else:
             # Complicated Evaluation stuff.
             flee_value = self.personality["flee"]["percent_of_missing_hp"] * (1 - entity.hp / entity.max_hp)
@@ -172,14 +368,18 @@ class AI(Component):
             heal_action = None
             damage_action = None
             target_index = 0
+            # Big battles score every opponent at once, the arrays are shared by all actions.
+            vectorize = numpy is not None and len(opponents) >= VECTORIZE_AT
+            if vectorize:
+                hp, max_hp = gatherHP(entity.game, opponents)
             for action in entity.actions:
                 # Catagorize Action Type
-                action_type = dummyFindActionType(entity, action)
+                action_type = action.getType().category
                 if action_type == "self_heal":
                     if not action.canApply([entity]):
                         continue
                     relevant_section = self.personality["heal"]["self"]["instant"]
-                    heal_amount = dummyTestSelfHeal(entity, action)
+                    heal_amount = action.getType().expectedHPChange([entity], 0)
                     self_heal_value += relevant_section["percent_of_total_hp"] * (heal_amount / entity.max_hp)
                     self_heal_value += relevant_section["percent_of_missing_hp"] * (heal_amount / (entity.max_hp - entity.hp)) if entity.max_hp != entity.hp else 0
                     self_heal_value += relevant_section["percent_of_remaining_hp"] * (heal_amount / entity.hp)
@@ -188,11 +388,18 @@ class AI(Component):
                     ...
                 elif action_type == "other_damage":
                     relevant_section = self.personality["attack"]["damage_to_target"]["instant"]
+                    if vectorize:
+                        best, score = scoreTargets(entity, action, opponents, hp, max_hp, relevant_section)
+                        if score > other_damage_value:
+                            damage_action = action
+                            other_damage_value = score
+                            target_index = best
+                        continue
                     for i, opponent in enumerate(opponents):
                         if not action.canApply([entity, opponent]):
                             continue
                         cache = 0
-                        damage_amount = dummyTestHurt([entity, opponent], action, 1)
+                        damage_amount = -action.getType().expectedHPChange([entity, opponent], 1)
                         cache += relevant_section["percent_of_total_hp"] * (damage_amount / opponent.max_hp)
                         cache += relevant_section["percent_of_remaining_hp"] * (damage_amount / opponent.hp)
                         if cache > other_damage_value:
@@ -202,15 +409,37 @@ class AI(Component):
             greatest = max(flee_value, self_heal_value, other_damage_value)
             if greatest == flee_value:
                 entity.flee()
-                print(f"{entity.name} fled!")
+                entity.game.emit("action", f"{entity.name} fled!", entity=entity.name)
             elif greatest == self_heal_value and heal_action != None:
-                print(f"{entity.name} used {heal_action} and healed itself!")
+                entity.game.emit("action", f"{entity.name} used {heal_action} and healed itself!", entity=entity.name, action=heal_action.getType().id)
                 heal_action.apply([entity])
             elif greatest == other_damage_value and damage_action != None:
-                print(f"{entity.name} used {damage_action} on {opponents[target_index].name} for {damage_amount} damage!")
-                damage_action.apply([entity, opponents[target_index]])
+                target = opponents[target_index]
+                hp_before = target.hp
+                damage_action.apply([entity, target])
+                damage_dealt = hp_before - target.hp
+                entity.game.emit("action", f"{entity.name} used {damage_action} on {target.name} for {damage_dealt} damage!", entity=entity.name, action=damage_action.getType().id, target=target.name, amount=damage_dealt)
             else:
-                print("No actions?")
+                entity.game.emit("action", "No actions?", entity=entity.name)
+
+    def searchTurn(self, battle, entity) -> bool:
+        """Take the entity's turn with the action Monte Carlo tree search picks, within the personality's
+        search milliseconds or iterations. Returns False without acting if there was nothing to pick.
+        """
+        from .lookahead import searchMove
+        move = searchMove(battle, entity, self.personality["search"])
+        if move is None:
+            return False
+        action, target = move
+        if target is None:
+            entity.game.emit("action", f"{entity.name} used {action}!", entity=entity.name, action=action.getType().id)
+            action.apply([entity])
+        else:
+            hp_before = target.hp
+            action.apply([entity, target])
+            damage_dealt = hp_before - target.hp
+            entity.game.emit("action", f"{entity.name} used {action} on {target.name} for {damage_dealt} damage!", entity=entity.name, action=action.getType().id, target=target.name, amount=damage_dealt)
+        return True
 
     @classmethod
     def fromDict(cls, data):
@@ -0,0 +1,113 @@
+from typing import Any, Iterator, Optional, Self
+import heapq
+
+
+class DecayingData:
+    """Data whose entries count down by one every tick and go once they pass 0, -1 never decays.
+
+    Entries are kept with the tick they expire on and a heap of those ticks, so a tick only
+    looks at the entries expiring on it. Reading an entry gives (value, decay left) like
+    the plain dictionaries it replaces.
+    """
+    __slots__ = ("__entries", "__expiries", "__tick")
+
+    def __init__(self, data: Optional[dict[str, Any]] = None):
+        # key -> (value, tick it expires on or -1), made on the first set as most entities have no data.
+        self.__entries: Optional[dict[str, tuple[Any, int]]] = None
+        # (tick, key) of decaying entries, ones removed or replaced early are skipped when they come up.
+        self.__expiries: Optional[list[tuple[int, str]]] = None
+        self.__tick: int = 0
+        if data is not None:
+            for key, (value, decay) in data.items():
+                self.set(key, value, decay)
+
+    def set(self, key: str, value: Any, decay: int) -> None:
+        """Set an entry that lasts decay more ticks, -1 for no decay.
+        """
+        if self.__entries is None:
+            self.__entries = {}
+        if decay == -1:
+            self.__entries[key] = (value, -1)
+            return
+        expiry = self.__tick + decay + 1
+        self.__entries[key] = (value, expiry)
+        if self.__expiries is None:
+            self.__expiries = []
+        heapq.heappush(self.__expiries, (expiry, key))
+
+    def tick(self, ticks: int = 1) -> None:
+        """Count every entry down by ticks, removing the ones that expire.
+        """
+        self.__tick += ticks
+        expiries = self.__expiries
+        if expiries is None:
+            return
+        entries = self.__entries
+        while len(expiries) > 0 and expiries[0][0] <= self.__tick:
+            expiry, key = heapq.heappop(expiries)
+            entry = entries.get(key)
+            if entry is not None and entry[1] == expiry:
+                del entries[key]
+        if len(expiries) == 0:
+            self.__expiries = None
+
+    def ticksUntilExpiry(self) -> Optional[int]:
+        """Get how many ticks until the next entry expires, None if none decay.
+
+        Can be early when that entry was replaced or removed.
+        """
+        if self.__expiries is None:
+            return None
+        return self.__expiries[0][0] - self.__tick
+
+    def value(self, key: str) -> Any:
+        """Get the value of an entry.
+        """
+        if self.__entries is None:
+            raise KeyError(key)
+        return self.__entries[key][0]
+
+    def __entry(self, entry: tuple[Any, int]) -> tuple[Any, int]:
+        """Turn a stored entry into (value, decay left).
+        """
+        return (entry[0], -1 if entry[1] == -1 else entry[1] - self.__tick - 1)
+
+    def __getitem__(self, key: str) -> tuple[Any, int]:
+        if self.__entries is None:
+            raise KeyError(key)
+        return self.__entry(self.__entries[key])
+
+    def __contains__(self, key: object) -> bool:
+        return self.__entries is not None and key in self.__entries
+
+    def __len__(self) -> int:
+        return 0 if self.__entries is None else len(self.__entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(()) if self.__entries is None else iter(self.__entries)
+
+    def items(self) -> list[tuple[str, tuple[Any, int]]]:
+        if self.__entries is None:
+            return []
+        return [(key, self.__entry(entry)) for key, entry in self.__entries.items()]
+
+    def pop(self, key: str) -> tuple[Any, int]:
+        """Remove an entry and return it, its place in the heap is skipped when it comes up.
+        """
+        if self.__entries is None:
+            raise KeyError(key)
+        return self.__entry(self.__entries.pop(key))
+
+    def copy(self) -> Self:
+        """Copy the data, the copy counts down on its own.
+        """
+        data = DecayingData.__new__(DecayingData)
+        data.__entries = None if self.__entries is None else self.__entries.copy()
+        data.__expiries = None if self.__expiries is None else self.__expiries.copy()
+        data.__tick = self.__tick
+        return data
+
+    def toDict(self) -> dict[str, tuple[Any, int]]:
+        """Convert to a dictionary of key -> (value, decay left).
+        """
+        return dict(self.items())
@@ -9,13 +9,17 @@ class DummyEntity:
         self.tags = entity_instance.tags
         self.max_hp = entity_instance.max_hp
         self.hp = entity_instance.hp
-        self.components = entity_instance.components.copy()
-        self.actions = entity_instance.actions
+        self.components = list(entity_instance.components)
+        self.actions = list(entity_instance.actions)
         self.xp = entity_instance.xp
         self.speed = entity_instance.speed
         self.faction = entity_instance.faction
         self.data = entity_instance.data.copy()
 
+    @property
+    def faction_id(self):
+        return self.game.faction_table.id(self.faction)
+
     def hasFaction(self):
         """Check if dummy has a faction.
         """
@@ -29,30 +33,20 @@ class DummyEntity:
     def isHostile(self, target):
         """Check if dummy is hostile to another.
         """
-        if self.hasFaction() and target.hasFaction():
-            return target.faction in self.getFaction().hostile
-        else:
-            return False
+        return self.game.faction_table.isHostile(self.faction_id, target.faction_id)
 
     def update(self, room):
         """Handle game update for dummy.
         """
-        for key in self.data:
-            value = self.data.pop(key)
-            if value[1] == 0:
-                pass
-            elif value[1] == -1:
-                self.data[key] = value
-            else:
-                self.data[key] = (value[0], value[1] - 1)
+        self.data.tick()
         for component in self.components:
             component.update(room, self)
 
-    def battleUpdate(self, battle, opponents):
-        """Handle battle update for dummy.
+    def battleUpdate(self, battle, participants):
+        """Handle battle update for dummy, participants include the dummy itself.
         """
         for component in self.components:
-            component.battle(battle, self, opponents)
+            component.battle(battle, self, participants)
 
     def changeHP(self, amount, respect_cap):
         """Change the dummies hp, respecting cap if specified.
@@ -64,6 +58,11 @@ class DummyEntity:
         if self.hp == 0:
             del self
 
+    def getComponents(self, component_class):
+        """Get all the dummy's components of a class.
+        """
+        return [component for component in self.components if isinstance(component, component_class)]
+
     def addAction(self, action_type):
         """Add an action to the dummy.
         """
@@ -78,44 +77,55 @@ class DummyEntity:
     def getData(self, key):
         """Get data from the dummy.
         """
-        return self.data[key][0]
+        return self.data.value(key)
 
     def addData(self, key, value, decay):
         """Add data to the dummy with decay, -1 for no decay.
         """
-        self.data[key] = (value, decay)
+        self.data.set(key, value, decay)
 
     def removeData(self, key):
         """Remove data from the dummy.
         """
         self.data.pop(key)
 
-def dummyFindActionType(entity, action):
-    """Determine the type of action.
+def dummyClassifyAbility(game, ability_type):
+    """Classify an ability type as self_heal, other_heal, other_damage or utility.
+
+    Creature targeting abilities are tried on dummies once when the ability loads, the random
+    state is put back afterwards so loading doesn't change it. Ones that also target an item,
+    interactable or room are only used through items and are left as utility.
     """
     from .entity import EntityInstance
-    targets = action.getType().targets
-    if "consumer" in targets:
-        if "creature" not in targets:
-            return "self_heal"
-        else:
-            dummy_self = DummyEntity(entity)
-            dummy_friendly = DummyEntity(EntityInstance(entity.game, EntityInstance.NULL_ENTITY_TYPE))
-            dummy_friendly.max_hp = 100
-            dummy_friendly.hp = 90
-            dummy_friendly.faction = entity.faction
-            old_hp_friendly = dummy_friendly.hp
-            action.apply([dummy_self, dummy_friendly])
-            dummy_hostile = DummyEntity(EntityInstance(entity.game, EntityInstance.NULL_ENTITY_TYPE))
-            dummy_hostile.max_hp = 100
-            dummy_hostile.hp = 100
-            dummy_hostile.faction = random.choice(entity.game.factions[entity.faction].hostile)
-            old_hp_hostile = dummy_hostile.hp
-            action.apply([dummy_self, dummy_hostile])
-            if old_hp_friendly < dummy_friendly.hp:
-                return "other_heal"
-            elif old_hp_hostile > dummy_hostile.hp:
-                return "other_damage"
+    targets = ability_type.targets
+    if "consumer" not in targets:
+        return "utility"
+    if "creature" not in targets:
+        return "self_heal"
+    if len(targets) != 2 or set(targets) != {"consumer", "creature"}:
+        return "utility"
+    state = random.getstate()
+    # Dummies copy what they need, so one blank entity makes all three.
+    blank = EntityInstance(game, EntityInstance.NULL_ENTITY_TYPE)
+    dummy_self = DummyEntity(blank)
+    dummy_friendly = DummyEntity(blank)
+    dummy_friendly.max_hp = 100
+    dummy_friendly.hp = 90
+    old_hp_friendly = dummy_friendly.hp
+    for effect in ability_type.effects:
+        effect([dummy_self, dummy_friendly])
+    dummy_hostile = DummyEntity(blank)
+    dummy_hostile.max_hp = 100
+    dummy_hostile.hp = 100
+    old_hp_hostile = dummy_hostile.hp
+    for effect in ability_type.effects:
+        effect([dummy_self, dummy_hostile])
+    random.setstate(state)
+    if old_hp_friendly < dummy_friendly.hp:
+        return "other_heal"
+    elif old_hp_hostile > dummy_hostile.hp:
+        return "other_damage"
+    return "utility"
 
 def dummyTestDeep(entity, action, targets):
     """Deprecated"""
@@ -0,0 +1,589 @@
+from .entity import EntityInstance, EntityType
+from .faction import Faction, FactionTable
+from .map.Map import Map
+from .map.RoomType import RoomType
+from .map.RoomInstance import RoomInstance
+from .map.RoomPool import RoomPool
+from .map.SpawnPool import SpawnPool
+from .map.Interactable import Interactable
+from .map.WorldScheduler import WorldScheduler
+from .components import Inventory, FunctionHolder
+from .classes import ClassType
+from .item import ItemType, ItemInstance
+from .ability import AbilityType, AbilityInstance
+from .battle import BattleManager
+from .entity_store import EntityStore
+from .pool import ObjectPools
+from typing import Any, Callable, Iterable, Iterator, Optional, cast
+import os, json
+
+# Mod folders are loaded in this order, later folders parse references to earlier ones.
+MOD_FOLDERS: list[str] = [
+    "factions",
+    "items",
+    "abilities",
+    "classes",
+    "entities",
+    "rooms",
+    "room_pools",
+    "spawn_pools",
+]
+
+DIRECTIONS: dict[str, tuple[int, int]] = {
+    "north": (0, 1),
+    "south": (0, -1),
+    "east": (1, 0),
+    "west": (-1, 0),
+}
+
+# The keys each command needs besides "type".
+COMMAND_KEYS: dict[str, tuple[str, ...]] = {
+    "start": ("name", "class"),
+    "move": ("direction",),
+    "interact": ("name",),
+    "level": ("class",),
+    "act": ("action",),
+    "attack": ("action",),
+    "use": ("slot",),
+    "save": ("name",),
+    "load": ("name",),
+}
+
+
+class Engine:
+    """The game world without a terminal.
+
+    Commands are dictionaries with a "type" key, the same shape mods use for scripts,
+    and every command returns a result dictionary holding the events it caused.
+    With columnar the hot fields of the player and room entities live in an EntityStore.
+    auto_resolve is how battles the player can't see are run, "simulate" runs them to the end
+    in one tick, "statistical" estimates their outcome and "turns" runs them a turn per tick.
+    With pooling the entities, items, interactables and abilities the world is done with are
+    kept in ObjectPools and reused, they become free at the start of the next tick.
+    """
+    def __init__(self, mods_path: str = "mods", saves_path: str = "saves", active_mods: Optional[list[str]] = None, columnar: bool = False, auto_resolve: str = "simulate", pooling: bool = False):
+        self.faction_table: FactionTable = FactionTable()
+        self.entity_store: Optional[EntityStore] = EntityStore(self.faction_table) if columnar else None
+        self.pools: Optional[ObjectPools] = ObjectPools() if pooling else None
+        self.player: EntityInstance = EntityInstance(self, EntityInstance.NULL_ENTITY_TYPE)
+        self.__mods: dict[str, bool] = {}
+        self.mods_path: str = mods_path
+        self.saves_path: str = saves_path
+        self.factions: dict[str, Faction] = {"player": Faction("player", "Player", [])}
+        self.entity_types: dict[str, EntityType] = {}
+        self.item_types: dict[str, ItemType] = {}
+        self.class_types: dict[str, ClassType] = {}
+        self.ability_types: dict[str, AbilityType] = {}
+        self.map: Map = Map()
+        self.battle_manager: BattleManager = BattleManager()
+        self.scheduler: WorldScheduler = WorldScheduler()
+        self.map.scheduler = self.scheduler
+        self.player_x: int = 0
+        self.player_y: int = 0
+        self.events: list[dict[str, Any]] = []
+        # Events are dropped while muted, off-screen battles are resolved muted.
+        self.muted: bool = False
+        self.auto_resolve: str = auto_resolve
+        # Rollouts per Monte Carlo tree search when a personality doesn't give its own, None searches for its milliseconds.
+        self.search_iterations: Optional[int] = None
+        self.pending_turn: Optional[Callable[[], None]] = None
+
+        self.getMods()
+        if active_mods is not None:
+            for key in self.__mods:
+                self.__mods[key] = key in active_mods
+        self.reloadWithActiveMods()
+
+    # region Mods
+    def mods(self) -> dict:
+        """Returns the mods.
+        """
+        return self.__mods
+
+    def getMods(self):
+        """Gets mods from the mods directory.
+        """
+        for file in os.scandir(self.mods_path):
+            if file.is_dir() and os.path.exists(file.path + "/mod.json"):
+                self.__mods[file.name] = False
+                with open(file.path + "/mod.json", "r") as f:
+                    mod_data = json.load(f)
+                    if "default_to_on" in mod_data:
+                        self.__mods[file.name] = mod_data["default_to_on"]
+
+    def swapEnable(self, index: int) -> None:
+        """Switches the enabled status of a mod.
+        """
+        key: str = list(self.__mods.keys())[index]
+        self.__mods[key] = not self.__mods[key]
+
+    def reloadWithActiveMods(self):
+        """Reloads the game with active mods.
+        """
+        mods = [f"{self.mods_path}/{key}" for key, value in self.__mods.items() if value]
+        for mod in mods:
+            self.loadMod(mod)
+        self.faction_table.compile(self.factions)
+
+    def __loadFolder(self, path: str, callback: Callable[[str, Any], None]) -> None:
+        """Calls the callback with the id and data of every json file in a folder.
+        """
+        for file_json in os.scandir(path):
+            if file_json.is_file() and file_json.name[-5:] == ".json":
+                with open(file_json.path, "r") as f:
+                    callback(file_json.name[:-5], json.load(f))
+
+    def loadMod(self, path: str) -> None:
+        """Loads all mods in the specified directory.
+        """
+        for folder in MOD_FOLDERS:
+            folder_path = f"{path}/{folder}"
+            if not os.path.isdir(folder_path):
+                continue
+            if folder == "classes":
+                self.__loadFolder(folder_path, lambda id, data: self.class_types.__setitem__(id, ClassType.fromDict(self, id, data)))
+            elif folder == "entities":
+                self.__loadFolder(folder_path, lambda id, data: self.entity_types.__setitem__(id, EntityType.fromDict(id, data)))
+            elif folder == "items":
+                self.__loadFolder(folder_path, lambda id, data: self.item_types.__setitem__(id, ItemType.fromDict(id, data)))
+            elif folder == "rooms":
+                self.__loadFolder(folder_path, lambda id, data: self.map.room_types.__setitem__(id, RoomType.fromDict(id, data)))
+            elif folder == "abilities":
+                self.__loadFolder(folder_path, lambda id, data: self.ability_types.__setitem__(id, AbilityType.fromDict(self, id, data)))
+            elif folder == "room_pools":
+                self.__loadFolder(folder_path, lambda id, data: self.map.addRoomPool(RoomPool.fromDict(self, id, data)))
+            elif folder == "factions":
+                self.__loadFolder(folder_path, self.__loadFaction)
+            elif folder == "spawn_pools":
+                self.__loadFolder(folder_path, lambda id, data: self.map.spawn_pool_types.__setitem__(id, SpawnPool.fromDict(self, id, data)))
+
+    def __loadFaction(self, id: str, data: dict[str, Any]) -> None:
+        """Loads a faction, making the player hostile back to it if needed.
+        """
+        self.factions[id] = Faction.fromDict(id, data)
+        if "player" in data["hostile"]:
+            self.factions["player"].hostile.append(id)
+    # endregion
+
+    # region Events
+    def emit(self, event_type: str, message: str = "", **details: Any) -> None:
+        """Record something that happened in the world.
+        """
+        if self.muted:
+            return
+        self.events.append({"type": event_type, "message": message, **details})
+
+    def drainEvents(self) -> list[dict[str, Any]]:
+        """Return and clear the recorded events.
+        """
+        events = self.events
+        self.events = []
+        return events
+
+    def result(self, command: str, ok: bool, message: str = "", **details: Any) -> dict[str, Any]:
+        """Build the result of a command with the events it caused.
+        """
+        return {"command": command, "ok": ok, "message": message, "events": self.drainEvents(), **details}
+
+    def enterCombat(self) -> None:
+        """Called when something starts a battle with the player.
+        """
+        self.emit("combat_started")
+
+    def playerTurn(self) -> None:
+        """Take the player's turn in a battle, called by the player's FunctionHolder.
+        """
+        turn = self.pending_turn if self.pending_turn is not None else self.choosePlayerTurn()
+        self.pending_turn = None
+        if turn is not None:
+            turn()
+        else:
+            self.emit("turn_passed", f"{self.player.name} waited.")
+
+    def choosePlayerTurn(self) -> Optional[Callable[[], None]]:
+        """Pick a turn for the player when no command queued one, None waits.
+        """
+        return None
+    # endregion
+
+    # region State
+    def getRoom(self) -> RoomInstance:
+        """Get the room the player is in.
+        """
+        return cast(RoomInstance, self.map.getRoom(self.player_x, self.player_y))
+
+    def getInventory(self) -> Optional[Inventory]:
+        """Get the player's inventory.
+        """
+        return self.player.getComponent(Inventory)
+
+    def getBattleParticipants(self) -> list[EntityInstance]:
+        """Get the participants of the player's battle, empty when not in one.
+        """
+        battle = self.battle_manager.battleOf(self.player)
+        return battle.participants if battle is not None else []
+
+    def getState(self) -> dict[str, Any]:
+        """Get a summary of the world around the player.
+        """
+        room = self.map.getRooms().get((self.player_x, self.player_y))
+        return {
+            "player": {
+                "name": self.player.name,
+                "hp": self.player.hp,
+                "max_hp": self.player.max_hp,
+                "xp": self.player.xp,
+                "x": self.player_x,
+                "y": self.player_y,
+                "dead": self.player.to_die,
+                "in_battle": self.player.hasData("in_battle"),
+            },
+            "room": {
+                "type": room[0].getType().id,
+                "entities": [entity.name for entity in room[0].iterEntities()],
+                "interactables": [interactable.name for interactable in room[0].iterInteractables()],
+            } if room != None else None,
+            "battle": [
+                {"name": participant.name, "hp": participant.hp, "max_hp": participant.max_hp, "faction": participant.faction}
+                for participant in self.getBattleParticipants()
+            ],
+            "rooms_explored": len(self.map.getRooms()),
+        }
+
+    def clearData(self) -> None:
+        """Clear data that is instance based.
+        """
+        if self.entity_store is not None:
+            self.entity_store = EntityStore(self.faction_table)
+        self.player = EntityInstance(self, EntityInstance.NULL_ENTITY_TYPE)
+        self.player_x = 0
+        self.player_y = 0
+        self.map.reset()
+        self.battle_manager = BattleManager()
+        self.scheduler = WorldScheduler(self.scheduler.radius, self.scheduler.detail_radius)
+        self.map.scheduler = self.scheduler
+        self.pending_turn = None
+    # endregion
+
+    # region Commands
+    def tick(self) -> None:
+        """Advance the world around the player by one step.
+        """
+        if self.pools is not None:
+            self.pools.settle()
+        self.scheduler.update(self)
+        self.battle_manager.updateBattles(self)
+        if self.player.to_die:
+            self.emit("player_died", f"{self.player.name} has died.")
+        elif (battle := self.battle_manager.battleOf(self.player)) is not None and len(battle.opponentsOf(self.player)) == 0:
+            self.player.flee()
+            self.emit("battle_won", "There is nothing left to fight.")
+
+    def startGame(self, name: str, class_id: str) -> dict[str, Any]:
+        """Create the player character and the starting room.
+        """
+        if class_id not in self.class_types:
+            return self.result("start", False, "That class does not exist.")
+        self.clearData()
+        self.player.name = name
+        self.player.max_hp = 100
+        self.player.hp = 100
+        self.player.addComponent(Inventory(12))
+        self.player.addComponent(FunctionHolder(None, self.playerTurn))
+        self.player.gainClassLevel(self.class_types[class_id], self.ability_types)
+        self.player.faction = "player"
+        if self.entity_store is not None:
+            self.entity_store.add(self.player)
+        self.map.setRoom(0, 0, "starting_room")
+        return self.result("start", True)
+
+    def move(self, direction: str) -> dict[str, Any]:
+        """Move the player to an adjacent room.
+        """
+        if direction not in DIRECTIONS:
+            return self.result("move", False, "You can only move north, south, east or west.\n")
+        offset = DIRECTIONS[direction]
+        if self.map.getRoom(self.player_x + offset[0], self.player_y + offset[1]) == None:
+            self.emit("wall", "There is a wall there.")
+        else:
+            self.player_x += offset[0]
+            self.player_y += offset[1]
+        self.tick()
+        return self.result("move", True, x=self.player_x, y=self.player_y)
+
+    def look(self) -> dict[str, Any]:
+        """Describe the player's room.
+        """
+        description = self.getRoom().getDescription()
+        self.tick()
+        return self.result("look", True, description)
+
+    def wait(self) -> dict[str, Any]:
+        """Let the world act without the player doing anything.
+        """
+        self.tick()
+        return self.result("wait", True)
+
+    def getInteractions(self, name: str) -> Optional[tuple[Interactable, list[AbilityInstance]]]:
+        """Find an interactable in the player's room by name and its uses.
+        """
+        for interactable in self.getRoom().iterInteractables():
+            if interactable.name == name:
+                if self.pools is not None:
+                    return interactable, [self.pools.make(AbilityInstance, self.ability_types[data]) for data in interactable.uses]
+                return interactable, [AbilityInstance(self.ability_types[data]) for data in interactable.uses]
+        return None
+
+    def interact(self, name: str, choice: int) -> dict[str, Any]:
+        """Use an interactable in the player's room.
+        """
+        found = self.getInteractions(name)
+        if found == None:
+            self.tick()
+            return self.result("interact", False, "There is nothing like that to interact with.\n")
+        interactable, interactions = found
+        if not 0 <= choice < len(interactions):
+            return self.result("interact", False, "Invalid Selection")
+        room = self.getRoom()
+        if not interactions[choice].canApply([self.player, interactable, room]):
+            return self.result("interact", False, "You can not do that interaction right now.\n")
+        interactions[choice].apply([self.player, interactable, room])
+        if self.pools is not None:
+            for interaction in interactions:
+                self.pools.give(interaction)
+            # Scripts that took the interactable out of the room are done with it by now.
+            if not room.hasInteractable(interactable):
+                self.pools.give(interactable)
+        self.tick()
+        return self.result("interact", True)
+
+    def levelUp(self, class_id: str) -> dict[str, Any]:
+        """Spend xp on a level in a class.
+        """
+        if class_id not in self.class_types:
+            return self.result("level", False, "That class does not exist.")
+        class_type: ClassType = self.class_types[class_id]
+        xp_cost: int = self.player.nextXPInClass(class_type)
+        if xp_cost == -1:
+            return self.result("level", False, "You are already max level.\n")
+        elif self.player.xp < xp_cost:
+            return self.result("level", False, "You lack the neccessary XP to take a level in this class.\n")
+        self.player.xp -= xp_cost
+        self.player.gainClassLevel(class_type, self.ability_types)
+        return self.result("level", True, f"You have gained one level in {class_type.name}.\n")
+
+    def applyAction(self, action_index: int, target_index: Optional[int] = None) -> dict[str, Any]:
+        """Use one of the player's actions right now.
+        """
+        if not 0 <= action_index < len(self.player.actions):
+            return self.result("act", False, "Invalid Selection")
+        action: AbilityInstance = self.player.actions[action_index]
+        if action.getType().category in ["other_heal", "other_damage"]:
+            creatures = self.getBattleParticipants()
+            if target_index == None or not 0 <= target_index < len(creatures):
+                return self.result("act", False, "That action needs a target.\n")
+            target = creatures[target_index]
+            if not action.canApply([self.player, target]):
+                return self.result("act", False, "You can not use that action on that target right now.\n")
+            calc: int = target.hp
+            action.apply([self.player, target])
+            calc -= target.hp
+            return self.result("act", True, f"{self.player.name} used {action.getType().name} on {target.name} for {calc} damage.")
+        if not action.canApply([self.player]):
+            return self.result("act", False, "You can not use that action right now.\n")
+        action.apply([self.player])
+        return self.result("act", True, f"{self.player.name} used {action.getType().name}.")
+
+    def applyItemUse(self, slot: int, use_index: int, target_index: Optional[int] = None) -> dict[str, Any]:
+        """Use an item in the player's inventory right now.
+        """
+        inventory = self.getInventory()
+        if inventory == None or not 0 <= slot < len(inventory.items):
+            return self.result("use", False, "Invalid Selection")
+        stack = inventory.items[slot]
+        if stack == None or len(stack.getType().uses) <= 0:
+            return self.result("use", False, "That item has no uses.\n")
+        if not 0 <= use_index < len(stack.getType().uses):
+            return self.result("use", False, "Invalid Selection")
+        action_type = self.ability_types[stack.getType().uses[use_index]]
+        action = AbilityInstance(action_type) if self.pools is None else self.pools.make(AbilityInstance, action_type)
+        if "creature" in action.getType().targets:
+            creatures = self.getBattleParticipants()
+            if target_index == None or not 0 <= target_index < len(creatures):
+                return self.result("use", False, "That item needs a target.\n")
+            target = creatures[target_index]
+            if not action.canApply([self.player, stack, target]):
+                return self.result("use", False, "You can not use that action on that target right now.\n")
+            calc: int = target.hp
+            action.apply([self.player, stack, target])
+            calc -= target.hp
+            self.__giveUsed(action, stack)
+            return self.result("use", True, f"{self.player.name} used {action.getType().name} on {target.name} for {calc} damage.")
+        if not action.canApply([self.player, stack]):
+            return self.result("use", False, "You can not use that action right now.\n")
+        action.apply([self.player, stack])
+        self.__giveUsed(action, stack)
+        return self.result("use", True, f"{self.player.name} used {stack.name}.")
+
+    def __giveUsed(self, action: AbilityInstance, stack: ItemInstance) -> None:
+        """Give an item use's action back to the pools, and the item if it was used up.
+        """
+        if self.pools is not None:
+            self.pools.give(action)
+            if stack.stack == 0 and stack.inventory is None:
+                self.pools.give(stack)
+
+    def __takeTurn(self, command: str, turn: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        """Queue a turn for the player and run the battle until it is taken.
+        """
+        outcome: dict[str, Any] = {}
+
+        def pending() -> None:
+            outcome.update(turn())
+            self.events.extend(outcome.pop("events"))
+            if outcome["message"]:
+                self.emit("player_action", outcome["message"])
+
+        self.pending_turn = pending
+        self.tick()
+        self.pending_turn = None
+        if not outcome:
+            return self.result(command, False, "The battle ended before your turn.")
+        return self.result(command, outcome["ok"], outcome["message"])
+
+    def act(self, action_index: int, target_index: Optional[int] = None) -> dict[str, Any]:
+        """Use one of the player's actions as their turn in a battle.
+        """
+        if not self.player.hasData("in_battle"):
+            return self.result("act", False, "You are not in a battle.")
+        return self.__takeTurn("act", lambda: self.applyAction(action_index, target_index))
+
+    def useItem(self, slot: int, use_index: int, target_index: Optional[int] = None) -> dict[str, Any]:
+        """Use an item, taking the player's turn if they are in a battle.
+        """
+        if not self.player.hasData("in_battle"):
+            return self.applyItemUse(slot, use_index, target_index)
+        return self.__takeTurn("use", lambda: self.applyItemUse(slot, use_index, target_index))
+
+    def flee(self) -> dict[str, Any]:
+        """Flee the player's battle as their turn.
+        """
+        if not self.player.hasData("in_battle"):
+            return self.result("flee", False, "You are not in a battle.")
+
+        def turn() -> dict[str, Any]:
+            self.player.flee()
+            return self.result("flee", True, f"{self.player.name} fled!")
+
+        return self.__takeTurn("flee", turn)
+
+    def save(self, name: str) -> dict[str, Any]:
+        """Save the game to the saves folder.
+        """
+        if not name.replace("_", "u").isalnum():
+            return self.result("save", False, "Save names must be alpha numeric.")
+        with open(f"{self.saves_path}/{name}.json", "w") as f:
+            json.dump(self.saveToDict(), f)
+        return self.result("save", True, "Game saved.")
+
+    def load(self, name: str) -> dict[str, Any]:
+        """Load a game from the saves folder.
+
+        A save that is missing or can't be read fails. One that breaks partway through loading
+        leaves no game loaded.
+        """
+        if not name.replace("_", "u").isalnum():
+            return self.result("load", False, "Save names must be alpha numeric.")
+        try:
+            with open(f"{self.saves_path}/{name}.json", "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return self.result("load", False, "There is no save with that name.")
+        except (OSError, ValueError):
+            return self.result("load", False, "That save can not be read.")
+        try:
+            self.loadFromDict(data)
+        except Exception:
+            self.clearData()
+            return self.result("load", False, "That save is corrupt.")
+        return self.result("load", True)
+
+    def quit(self) -> dict[str, Any]:
+        """End the current game.
+        """
+        self.clearData()
+        return self.result("quit", True)
+
+    def execute(self, command: dict[str, Any]) -> dict[str, Any]:
+        """Run a command dictionary and return its result, a command missing a key it needs fails.
+        """
+        if not isinstance(command, dict) or "type" not in command:
+            return self.result("", False, "Commands need a type.")
+        missing = [key for key in COMMAND_KEYS.get(command["type"], ()) if key not in command]
+        if len(missing) > 0:
+            return self.result(command["type"], False, f"The {command['type']} command needs {', '.join(missing)}.")
+        match command["type"]:
+            case "start":
+                return self.startGame(command["name"], command["class"])
+            case "move":
+                return self.move(command["direction"])
+            case "look":
+                return self.look()
+            case "wait":
+                return self.wait()
+            case "interact":
+                return self.interact(command["name"], command.get("choice", 0))
+            case "level":
+                return self.levelUp(command["class"])
+            case "act" | "attack":
+                return self.act(command["action"], command.get("target"))
+            case "use":
+                return self.useItem(command["slot"], command.get("use", 0), command.get("target"))
+            case "flee":
+                return self.flee()
+            case "save":
+                return self.save(command["name"])
+            case "load":
+                return self.load(command["name"])
+            case "quit":
+                return self.quit()
+            case "state":
+                return self.result("state", True, state=self.getState())
+        return self.result(command["type"], False, "Unknown command.")
+
+    def run(self, commands: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        """Run a stream of commands, yielding each result.
+        """
+        for command in commands:
+            yield self.execute(command)
+    # endregion
+
+    def loadFromDict(self, data) -> None:
+        """Loads a game state from a dictionary.
+        """
+        self.player = EntityInstance.fromDict(data["player"], self)
+        self.player.removeComponent(None) # pyright: ignore
+        self.player.addComponent(FunctionHolder(None, self.playerTurn))
+        self.player_x = data["player_x"]
+        self.player_y = data["player_y"]
+        self.map.reset()
+        self.scheduler = WorldScheduler(self.scheduler.radius, self.scheduler.detail_radius)
+        self.map.scheduler = self.scheduler
+        if self.entity_store is not None:
+            self.entity_store = EntityStore(self.faction_table)
+            self.entity_store.add(self.player)
+        self.map.loadFromDict(data["map"], self)
+        self.battle_manager = BattleManager.fromDict(data["battle_manager"], self)
+        self.player.battleLoad()
+        self.map.battleLoad()
+
+    def saveToDict(self) -> dict[str, Any]:
+        """Saves game to a dictionary.
+        """
+        return {
+            "player": self.player.toDict(),
+            "player_x": self.player_x,
+            "player_y": self.player_y,
+            "map": self.map.toDict(),
+            "battle_manager": self.battle_manager.toDict(),
+        }
@@ -1,7 +1,10 @@
 from .classes import ClassInstance, ClassType
-from .components import componentFromData, Component
+from .components import componentFromData, dispatchTable, Component, DispatchTable
 from .ability import AbilityInstance
-from typing import Any, Self, cast
+from .decay import DecayingData
+from typing import Any, Optional, Self, Sequence, TypeVar, cast
+
+ComponentT = TypeVar("ComponentT", bound=Component)
 
 
 class EntityType:
@@ -9,9 +12,9 @@ class EntityType:
         self.id: str = id
         self.name: str = name
         self.description: str = description
-        self.tags: list[str] = tags
+        self.tags: tuple[str, ...] = tuple(tags)
         self.hp: int = hp
-        self.components: list[Component] = []
+        self.components: tuple[Component, ...] = ()
         self.actions: list[AbilityInstance] = []
         self.classes: list[ClassInstance] = []
         self.xp: int = xp
@@ -34,24 +37,149 @@ class EntityType:
 
 
 class EntityInstance:
+    """An entity in the world, change its tags and components with addTag, removeTag, addComponent and removeComponent.
+    """
+    __slots__ = ("game", "__entity_type", "__name", "__description", "__tags", "max_hp", "hp", "__components", "__dispatch", "actions", "__action_index", "__classes", "xp", "speed", "faction_id", "data", "to_die", "store", "store_id")
     NULL_ENTITY_TYPE = EntityType("", "", "", [], 1, 0, 0)
 
     def __init__(self, game, entity_type: EntityType):
         self.game = game
         self.__entity_type: EntityType = entity_type
-        self.name: str = self.__entity_type.name
-        self.description: str = self.__entity_type.description
-        self.tags: list[str] = self.__entity_type.tags
+        self.__name: str | None = None
+        self.__description: str | None = None
+        self.__tags: list[str] | None = None
         self.max_hp: int = self.__entity_type.hp
         self.hp: int = self.__entity_type.hp
-        self.components: list[Component] = self.__entity_type.components.copy()
+        self.__components: list[Component] | None = None
+        self.__dispatch: DispatchTable = dispatchTable(entity_type.components)
         self.actions: list[AbilityInstance] = []
-        self.__classes: list[ClassInstance] = []
+        # Made the first time an action is looked up by type.
+        self.__action_index: Optional[dict[Any, AbilityInstance]] = None
+        self.__classes: dict[ClassType, ClassInstance] = {}
         self.xp: int = self.__entity_type.xp
         self.speed: int = self.__entity_type.speed
-        self.faction: str = ""
-        self.data: dict[str, tuple[Any, int]] = {}
+        self.faction_id: int = 0
+        self.data: DecayingData = DecayingData()
         self.to_die: bool = False
+        # Set while the entity's fields live in an EntityStore.
+        self.store: Optional[Any] = None
+        self.store_id: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        return self.__entity_type.name if self.__name is None else self.__name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self.__name = value
+
+    @property
+    def description(self) -> str:
+        return self.__entity_type.description if self.__description is None else self.__description
+
+    @description.setter
+    def description(self, value: str) -> None:
+        self.__description = value
+
+    @property
+    def tags(self) -> Sequence[str]:
+        return self.__entity_type.tags if self.__tags is None else self.__tags
+
+    @tags.setter
+    def tags(self, value: Sequence[str]) -> None:
+        self.__tags = list(value)
+
+    @property
+    def faction(self) -> str:
+        return self.game.faction_table.names[self.faction_id]
+
+    @faction.setter
+    def faction(self, value: str) -> None:
+        self.faction_id = self.game.faction_table.id(value)
+
+    @property
+    def components(self) -> Sequence[Component]:
+        return self.__entity_type.components if self.__components is None else self.__components
+
+    @components.setter
+    def components(self, value: Sequence[Component]) -> None:
+        self.__components = list(value)
+        self.__dispatch = dispatchTable(self.__components)
+
+    def addTag(self, tag: str) -> None:
+        """Add a tag to the entity if it doesn't have it.
+        """
+        if self.__tags is None:
+            self.__tags = list(self.__entity_type.tags)
+        if tag not in self.__tags:
+            self.__tags.append(tag)
+
+    def removeTag(self, tag: str) -> None:
+        """Remove a tag from the entity if it has it.
+        """
+        if tag in self.tags:
+            if self.__tags is None:
+                self.__tags = list(self.__entity_type.tags)
+            self.__tags.remove(tag)
+
+    def addComponent(self, component: Component) -> None:
+        """Add a component to the entity.
+        """
+        if self.__components is None:
+            self.__components = list(self.__entity_type.components)
+        self.__components.append(component)
+        self.__dispatch = dispatchTable(self.__components)
+
+    def removeComponent(self, component: Component) -> None:
+        """Remove a component from the entity.
+        """
+        if self.__components is None:
+            self.__components = list(self.__entity_type.components)
+        self.__components.remove(component)
+        self.__dispatch = dispatchTable(self.__components)
+
+    def getComponent(self, component_class: type[ComponentT]) -> Optional[ComponentT]:
+        """Get the entity's first component of a class, None if it has none.
+        """
+        indexes = self.__dispatch.by_class.get(component_class)
+        return None if indexes is None else cast(ComponentT, self.components[indexes[0]])
+
+    def getComponents(self, component_class: type[ComponentT]) -> list[ComponentT]:
+        """Get all the entity's components of a class.
+        """
+        components = self.components
+        return [cast(ComponentT, components[i]) for i in self.__dispatch.by_class.get(component_class, ())]
+
+    def clone(self) -> "EntityInstance":
+        """Copy the entity with its own components, actions, classes and data.
+
+        Used to spawn entities from a prototype, it is never in a store or a battle. With the
+        game's pools the copy is a free entity with every field set again.
+        """
+        pools = self.game.pools
+        entity = pools.take(EntityInstance) if pools is not None else None
+        if entity is None:
+            entity = EntityInstance.__new__(EntityInstance)
+        entity.game = self.game
+        entity.__entity_type = self.__entity_type
+        entity.__name = self.__name
+        entity.__description = self.__description
+        entity.__tags = None if self.__tags is None else self.__tags.copy()
+        entity.max_hp = self.max_hp
+        entity.hp = self.hp
+        entity.__components = None if self.__components is None else [component.clone(pools) for component in self.__components]
+        entity.__dispatch = self.__dispatch
+        entity.actions = [AbilityInstance(action.getType()) for action in self.actions]
+        entity.__action_index = None
+        entity.__classes = {class_type: ClassInstance(class_type, class_instance.level) for class_type, class_instance in self.__classes.items()}
+        entity.xp = self.xp
+        entity.speed = self.speed
+        entity.faction_id = self.faction_id
+        entity.data = self.data.copy()
+        entity.to_die = self.to_die
+        entity.store = None
+        entity.store_id = None
+        return entity
 
     def getDescription(self) -> str:
         """Return the description of the entity.
@@ -62,20 +190,20 @@ class EntityInstance:
         """Return classes display string.
         """
         string: str = ""
-        for class_data in self.__classes:
+        for class_data in self.__classes.values():
             string += class_data.getType().name + " " + str(class_data.level + 1) + "\n"
         return string
     
     def getClassesLineString(self) -> str:
         """Return classes display string for inline display.
         """
-        string: str = ", ".join([f"{class_data.getType().name} {class_data.level + 1}" for class_data in self.__classes])
+        string: str = ", ".join([f"{class_data.getType().name} {class_data.level + 1}" for class_data in self.__classes.values()])
         return string
 
     def hasFaction(self) -> bool:
         """Check if entity has a faction.
         """
-        return self.faction != ""
+        return self.faction_id != 0
 
     def getFaction(self):
         """Get the faction of the entity.
@@ -85,7 +213,7 @@ class EntityInstance:
     def isHostile(self, target: Self) -> bool:
         """Check if entity is hostile to another.
         """
-        return target.faction in self.getFaction().hostile if self.hasFaction() and target.hasFaction() else False
+        return self.game.faction_table.isHostile(self.faction_id, target.faction_id)
 
     def addXP(self, amount: int) -> None:
         """Add xp to the entity.
@@ -95,54 +223,46 @@ class EntityInstance:
     def update(self, room) -> None:
         """Handle game update for entity.
         """
-        for key in list(self.data.keys()):
-            value: tuple[Any, int] = self.data.pop(key)
-            if value[1] == 0:
-                pass
-            elif value[1] == -1:
-                self.data[key] = value
-            else:
-                self.data[key] = (value[0], value[1] - 1)
-        for component in self.components:
-            component.update(room, self)
+        self.data.tick()
+        components = self.components
+        for i in self.__dispatch.hooks[0]:
+            components[i].update(room, self)
 
-    def battleUpdate(self, battle, opponents) -> None:
-        """Handle battle update for entity.
+    def battleUpdate(self, battle, participants) -> None:
+        """Handle battle update for entity, participants include the entity itself.
         """
-        for component in self.components:
-            component.battle(battle, self, opponents)
+        components = self.components
+        for i in self.__dispatch.hooks[1]:
+            components[i].battle(battle, self, participants)
 
     def levelInClass(self, class_type: ClassType):
         """Get entities current level in a class type, -1 for none.
         """
-        for class_instance in self.__classes:
-            if class_instance.getType() == class_type:
-                return class_instance.level
-        return -1
+        class_instance = self.__classes.get(class_type)
+        return -1 if class_instance is None else class_instance.level
     
     def nextXPInClass(self, class_type: ClassType) -> int:
         """Get the next amount of xp to get another level in a class.
         """
-        for class_instance in self.__classes:
-            if class_instance.getType() == class_type:
-                return class_type.level_data[class_instance.level + 1].xp_cost if class_instance.level + 1 < class_type.maxLevel() else -1
-        return class_type.level_data[0].xp_cost
+        class_instance = self.__classes.get(class_type)
+        if class_instance is None:
+            return class_type.level_data[0].xp_cost
+        return class_type.level_data[class_instance.level + 1].xp_cost if class_instance.level + 1 < class_type.maxLevel() else -1
 
     def gainClassLevel(self, class_type: ClassType, ability_types):
         """Gain one leve in a class for the entity.
         """
-        for class_instance in self.__classes:
-            if class_instance.getType() == class_type:
-                level = class_instance.level + 1
-                if level == class_type.maxLevel():
-                    return
-                else:
-                    class_type.level_data[level].applyTo(self, ability_types)
-                    class_instance.level += 1
-                    return
+        class_instance = self.__classes.get(class_type)
+        if class_instance is not None:
+            level = class_instance.level + 1
+            if level == class_type.maxLevel():
+                return
+            class_type.level_data[level].applyTo(self, ability_types)
+            class_instance.level += 1
+            return
         class_instance = ClassInstance(class_type, 0)
         class_type.level_data[0].applyTo(self, ability_types)
-        self.__classes.append(class_instance)
+        self.__classes[class_type] = class_instance
 
     def changeHP(self, amount: int, respect_cap: bool) -> bool:
         """Change the entities hp, respecting cap if specified.
@@ -159,21 +279,35 @@ class EntityInstance:
     def addAction(self, action_type):
         """Add an action to the entity.
         """
-        self.actions.append(AbilityInstance(action_type))
+        action = AbilityInstance(action_type)
+        self.actions.append(action)
+        if self.__action_index is not None:
+            self.__action_index.setdefault(action_type, action)
+
+    def getAction(self, action_type) -> Optional[AbilityInstance]:
+        """Get the entity's first action of a type, None if it has none.
+        """
+        if self.__action_index is None:
+            self.__action_index = {}
+            for action in self.actions:
+                self.__action_index.setdefault(action.getType(), action)
+        return self.__action_index.get(action_type)
     
     def hasAction(self, action_type):
         """Check if entity has an action of a type.
         """
-        for action in self.actions:
-            if action.getType() == action_type:
-                return True
-        return False
+        return self.getAction(action_type) is not None
     
     def battleLoad(self):
         """Battle load, called after loading battle manager to prevent crashes.
+
+        Data pointing at a battle that wasn't loaded is dropped, so the entity isn't left in it.
         """
         if self.hasData("in_battle"):
-            self.game.battle_manager.joinBattle(self, self.getData("in_battle"))
+            if self.getData("in_battle") in self.game.battle_manager.battles:
+                self.game.battle_manager.joinBattle(self, self.getData("in_battle"))
+            else:
+                self.removeData("in_battle")
 
     def flee(self):
         """Have the entity leave a battle if it is in one.
@@ -189,8 +323,9 @@ class EntityInstance:
     def death(self, room):
         """Handles the entity dying in a room.
         """
-        for component in self.components:
-            component.death(room, self)
+        components = self.components
+        for i in self.__dispatch.hooks[2]:
+            components[i].death(room, self)
 
     def hasData(self, key):
         """Check if entity has data of a key.
@@ -200,12 +335,12 @@ class EntityInstance:
     def getData(self, key):
         """Get data from the entity.
         """
-        return self.data[key][0]
+        return self.data.value(key)
 
     def addData(self, key, value, decay):
         """Add data to the entity with decay, -1 for no decay.
         """
-        self.data[key] = (value, decay)
+        self.data.set(key, value, decay)
 
     def removeData(self, key):
         """Remove data from the entity.
@@ -231,12 +366,13 @@ class EntityInstance:
     def fromDict(cls, data, game):
         """Deserialize an entity from a dictionary and create an instance.
         """
-        entity = cls(game, game.entity_types[data["type"]] if data["type"] != "" else EntityInstance.NULL_ENTITY_TYPE)
-        if "name" in data:
+        entity_type: EntityType = game.entity_types[data["type"]] if data["type"] != "" else EntityInstance.NULL_ENTITY_TYPE
+        entity = cls(game, entity_type)
+        if "name" in data and data["name"] != entity_type.name:
             entity.name = data["name"]
-        if "description" in data:
+        if "description" in data and data["description"] != entity_type.description:
             entity.description = data["description"]
-        if "tags" in data:
+        if "tags" in data and tuple(data["tags"]) != entity_type.tags:
             entity.tags = data["tags"]
         if "max_hp" in data:
             entity.max_hp = data["max_hp"]
@@ -255,13 +391,14 @@ class EntityInstance:
             for action in data["actions"]:
                 entity.addAction(game.ability_types[action])
         if "classes" in data:
-            entity.__classes = [
-                ClassInstance.fromDict(class_data, game.class_types) for class_data in data["classes"]
-            ]
+            entity.__classes = {
+                class_instance.getType(): class_instance
+                for class_instance in (ClassInstance.fromDict(class_data, game.class_types) for class_data in data["classes"])
+            }
         if "faction" in data:
             entity.faction = data["faction"]
         if "data" in data:
-            entity.data = data["data"]
+            entity.data = DecayingData(data["data"])
         return entity
 
     def toDict(self):
@@ -271,7 +408,7 @@ class EntityInstance:
             "type": self.__entity_type.id,
             "name": self.name,
             "description": self.description,
-            "tags": self.tags,
+            "tags": list(self.tags),
             "max_hp": self.max_hp,
             "hp": self.hp,
             "xp": self.xp,
@@ -280,8 +417,8 @@ class EntityInstance:
                 component_data.toDict() for component_data in self.components
             ],
             "actions": [action_data.getType().id for action_data in self.actions],
-            "classes": [class_data.toDict() for class_data in self.__classes],
+            "classes": [class_data.toDict() for class_data in self.__classes.values()],
             "faction": self.faction,
-            "data": self.data,
+            "data": self.data.toDict(),
         }
 
@@ -0,0 +1,179 @@
+from .entity import EntityInstance
+from .faction import FactionTable
+from array import array
+from typing import Any, Optional, cast
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The fields that move into columns when an entity joins a store.
+STORED_FIELDS: list[str] = ["hp", "max_hp", "xp", "speed", "faction_id", "to_die"]
+
+
+def numberColumnProperty(name: str) -> property:
+    """Make a property that reads and writes an entity's value in a number column.
+    """
+    def getter(self) -> Any:
+        value: float = getattr(self.store, name)[self.store_id]
+        return int(value) if value.is_integer() else value
+
+    def setter(self, value: Any) -> None:
+        getattr(self.store, name)[self.store_id] = value
+
+    return property(getter, setter)
+
+
+class StoredEntityInstance(EntityInstance):
+    """An EntityInstance whose hot fields live in an EntityStore's columns.
+
+    Entities become this class when added to a store and go back when removed, it adds no
+    slots so the two layouts stay interchangeable.
+    """
+    __slots__ = ()
+
+    hp = numberColumnProperty("hp")
+    max_hp = numberColumnProperty("max_hp")
+    xp = numberColumnProperty("xp")
+    speed = numberColumnProperty("speed")
+
+    @property
+    def faction_id(self) -> int:
+        return self.store.faction_id[self.store_id]
+
+    @faction_id.setter
+    def faction_id(self, value: int) -> None:
+        self.store.faction_id[self.store_id] = value
+
+    @property
+    def to_die(self) -> bool:
+        return self.store.to_die[self.store_id] == 1
+
+    @to_die.setter
+    def to_die(self, value: bool) -> None:
+        self.store.to_die[self.store_id] = 1 if value else 0
+
+
+class EntityStore:
+    """Struct of arrays storage for hp, max_hp, xp, speed, faction_id and to_die, indexed by store id.
+
+    Bulk queries run over the columns with NumPy when it is installed, and fall back to
+    plain loops over the arrays when it is not. Faction ids come from the game's FactionTable.
+    """
+    def __init__(self, factions: FactionTable):
+        self.factions: FactionTable = factions
+        self.hp: array = array("d")
+        self.max_hp: array = array("d")
+        self.xp: array = array("d")
+        self.speed: array = array("d")
+        self.faction_id: array = array("i")
+        self.to_die: bytearray = bytearray()
+        self.entities: list[Optional[StoredEntityInstance]] = []
+        self.free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.entities) - len(self.free)
+
+    def contains(self, entity: Any) -> bool:
+        """Check if an entity lives in this store.
+        """
+        return isinstance(entity, StoredEntityInstance) and entity.store is self
+
+    def add(self, entity: EntityInstance) -> StoredEntityInstance:
+        """Move an entity's hot fields into the columns and make it a view onto them, taking it out of any other store first.
+        """
+        if self.contains(entity):
+            return cast(StoredEntityInstance, entity)
+        if isinstance(entity, StoredEntityInstance):
+            entity.store.remove(entity)
+        values = [getattr(entity, field) for field in STORED_FIELDS]
+        if len(self.free) > 0:
+            store_id = self.free.pop()
+            self.entities[store_id] = cast(StoredEntityInstance, entity)
+        else:
+            store_id = len(self.entities)
+            self.entities.append(cast(StoredEntityInstance, entity))
+            self.hp.append(0)
+            self.max_hp.append(0)
+            self.xp.append(0)
+            self.speed.append(0)
+            self.faction_id.append(0)
+            self.to_die.append(0)
+        for field in STORED_FIELDS:
+            delattr(entity, field)
+        entity.__class__ = StoredEntityInstance
+        entity.store = self
+        entity.store_id = store_id
+        for field, value in zip(STORED_FIELDS, values):
+            setattr(entity, field, value)
+        return cast(StoredEntityInstance, entity)
+
+    def remove(self, entity: EntityInstance) -> None:
+        """Copy an entity's fields back out of the columns and free its id.
+        """
+        if not self.contains(entity):
+            return
+        stored = cast(StoredEntityInstance, entity)
+        values = [getattr(stored, field) for field in STORED_FIELDS]
+        store_id = stored.store_id
+        entity.__class__ = EntityInstance
+        entity.store = None
+        entity.store_id = None
+        for field, value in zip(STORED_FIELDS, values):
+            setattr(entity, field, value)
+        self.entities[store_id] = None
+        self.free.append(store_id)
+
+    def storeIds(self, entities: list[Any]) -> Optional[list[int]]:
+        """Get the store ids of entities, None if any of them is not in this store.
+        """
+        ids: list[int] = []
+        for entity in entities:
+            if not self.contains(entity):
+                return None
+            ids.append(entity.store_id)
+        return ids
+
+    def orderBySpeed(self, entities: list[Any]) -> list[Any]:
+        """Sort entities fastest first, keeping the given order for ties.
+        """
+        ids = self.storeIds(entities)
+        if ids is None:
+            return sorted(entities, key=lambda entity: -entity.speed)
+        if numpy is not None:
+            speeds = numpy.frombuffer(self.speed, dtype=numpy.float64)[ids]
+            return [entities[i] for i in numpy.argsort(-speeds, kind="stable")]
+        speed = self.speed
+        return [entities[i] for i in sorted(range(len(ids)), key=lambda i: -speed[ids[i]])]
+
+    def hpColumns(self, entities: list[Any]) -> Optional[tuple[Any, Any]]:
+        """Get the hp and max_hp of entities as NumPy arrays, None if any of them is not in this store or NumPy isn't installed.
+        """
+        ids = self.storeIds(entities)
+        if ids is None or numpy is None:
+            return None
+        return numpy.frombuffer(self.hp, dtype=numpy.float64)[ids], numpy.frombuffer(self.max_hp, dtype=numpy.float64)[ids]
+
+    def dead(self, entities: list[Any]) -> list[Any]:
+        """Get the entities that are marked to die.
+        """
+        ids = self.storeIds(entities)
+        if ids is None:
+            return [entity for entity in entities if entity.to_die]
+        if numpy is not None:
+            to_die = numpy.frombuffer(self.to_die, dtype=numpy.uint8)[ids]
+            return [entities[i] for i in numpy.flatnonzero(to_die)]
+        to_die = self.to_die
+        return [entities[i] for i, store_id in enumerate(ids) if to_die[store_id]]
+
+    def hostileTo(self, faction_id: int, entities: list[Any]) -> list[Any]:
+        """Get the entities a faction is hostile to, keeping their order.
+        """
+        ids = self.storeIds(entities)
+        if ids is None or numpy is None:
+            return self.factions.hostileTo(faction_id, entities)
+        if self.factions.hostility[faction_id] == 0:
+            return []
+        hostile = self.factions.lookup(faction_id)[numpy.frombuffer(self.faction_id, dtype=numpy.int32)[ids]]
+        return [entities[i] for i in numpy.flatnonzero(hostile)]
@@ -1,4 +1,9 @@
-from typing import Any, Self
+from typing import Any, Self, Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 faction_names = ["A", "B", "C", "D"]
 
@@ -21,4 +26,63 @@ class Faction:
         return {
             "name": self.name,
             "hostile": self.hostile
-        }
\ No newline at end of file
+        }
+
+class FactionTable:
+    """Factions interned to small integer ids, with hostility compiled into one bitset per faction.
+
+    Id 0 is no faction, nothing is hostile to it and it is hostile to nothing. Bit j of
+    hostility[i] is set when faction i is hostile to faction j.
+    """
+    def __init__(self):
+        self.ids: dict[str, int] = {"": 0}
+        self.names: list[str] = [""]
+        self.hostility: list[int] = [0]
+        self.__lookups: dict[int, Any] = {}
+
+    def id(self, name: str) -> int:
+        """Get the id of a faction name, adding it with no hostility if needed.
+        """
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.hostility.append(0)
+            self.__lookups = {}
+        return self.ids[name]
+
+    def compile(self, factions: dict[str, Faction]) -> None:
+        """Build the hostility bitsets from the loaded factions, ids already given out are kept.
+        """
+        for faction_id in factions:
+            self.id(faction_id)
+        for faction_id, faction in factions.items():
+            mask = 0
+            for hostile in faction.hostile:
+                if hostile != "":
+                    mask |= 1 << self.id(hostile)
+            self.hostility[self.ids[faction_id]] = mask
+        self.__lookups = {}
+
+    def isHostile(self, faction_id: int, target_id: int) -> bool:
+        """Check if a faction is hostile to another by id.
+        """
+        return (self.hostility[faction_id] >> target_id) & 1 == 1
+
+    def hostileTo(self, faction_id: int, entities: Sequence[Any]) -> list[Any]:
+        """Get the entities a faction is hostile to, keeping their order.
+        """
+        mask = self.hostility[faction_id]
+        if mask == 0:
+            return []
+        return [entity for entity in entities if (mask >> entity.faction_id) & 1]
+
+    def lookup(self, faction_id: int) -> Any:
+        """Get a NumPy array indexed by faction id that is True where the faction is hostile.
+
+        Used to answer hostileTo over a column of faction ids in one operation, only
+        available when NumPy is installed.
+        """
+        if faction_id not in self.__lookups:
+            mask = self.hostility[faction_id]
+            self.__lookups[faction_id] = numpy.array([(mask >> i) & 1 == 1 for i in range(len(self.names))], dtype=bool)
+        return self.__lookups[faction_id]
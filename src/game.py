@@ -1,18 +1,12 @@
-from .entity import EntityInstance, EntityType
-from .faction import Faction
-from .map.Map import Map
-from .map.RoomType import RoomType
+from .engine import Engine
+from .entity import EntityInstance
 from .map.RoomInstance import RoomInstance
-from .map.RoomPool import RoomPool
-from .map.SpawnPool import SpawnPool
 from .util import intput
 from .menu import MenuType, MenuInstance
-from .components import Inventory, FunctionHolder
+from .components import Inventory
 from .classes import ClassType
-from .item import ItemType, ItemInstance
-from .ability import AbilityType, AbilityInstance
-from .battle import BattleManager
-from .dummy import dummyFindActionType
+from .item import ItemInstance
+from .ability import AbilityInstance
 from typing import cast, Any, Callable
 from os import DirEntry
 import os, json
@@ -134,30 +128,40 @@ def remapAndCallback(remap_function, callback):
 # endregion
 
 
-class Game:
+class Game(Engine):
+    """The CLI client, menus that print and read input around the Engine.
+    """
     def __init__(self):
-        self.player: EntityInstance = EntityInstance(self, EntityInstance.NULL_ENTITY_TYPE)
-        self.__mods = {}
-        self.factions: dict[str, Faction] = {"player": Faction("player", "Player", [])}
-        self.entity_types: dict[str, EntityType] = {}
-        self.item_types: dict[str, ItemType] = {}
-        self.class_types: dict[str, ClassType] = {}
-        self.ability_types: dict[str, AbilityType] = {}
-        self.map: Map = Map()
-        self.battle_manager: BattleManager = BattleManager()
         self.menu_stack = []
         self.menu_cache = {}
         self.saves: list[DirEntry[str]] = []
-
         self.menus: dict[str, MenuType] = {}
-        self.rebuildMenus()
+
+        super().__init__()
 
         self.addMenu("main_menu")()
 
-        self.getMods()
-        self.reloadWithActiveMods()
-        self.player_x: int = 0
-        self.player_y: int = 0
+    def emit(self, event_type: str, message: str = "", **details: Any) -> None:
+        """Print events as they happen instead of recording them.
+        """
+        if message and not self.muted:
+            print(message)
+
+    def enterCombat(self) -> None:
+        """Open the combat menu when something attacks the player.
+        """
+        self.addMenu("dungeon_combat")()
+
+    def playerTurn(self) -> None:
+        """Ask the player for their turn.
+        """
+        self.combatMenu()
+
+    def reloadWithActiveMods(self):
+        """Reloads the game with active mods.
+        """
+        super().reloadWithActiveMods()
+        self.rebuildMenus()
 
     def rebuildMenus(self) -> None:
         """Rebuilds the menus for when there are changes that require rebuilds.
@@ -309,8 +313,9 @@ class Game:
             while True:
                 persona_non_grata: int = intput("Option: ") - 1
                 if persona_non_grata == 0:
-                    with open(self.saves[choice].path, "r") as f:
-                        self.loadFromDict(json.load(f))
+                    result = self.load(self.saves[choice].name[:-5])
+                    if not result["ok"]:
+                        print(result["message"] + "\n")
                     break
                 elif persona_non_grata == 1:
                     strung: str = self.player.name
@@ -335,12 +340,9 @@ class Game:
                     self.map.loadFromDict(data["map"], self)
                     print(player.detailedBattleDescription())
                     print("Inventory: ")
-                    index_of_inventory = 0
-                    for i, component in enumerate(player.components):
-                        if isinstance(component, Inventory):
-                            index_of_inventory = i
-                    just = len(str(len(cast(Inventory, player.components[index_of_inventory]).items)))
-                    for i, item in enumerate(cast(Inventory, player.components[index_of_inventory]).items):
+                    inventory = cast(Inventory, player.getComponent(Inventory))
+                    just = len(str(len(inventory.items)))
+                    for i, item in enumerate(inventory.items):
                         if item != None:
                             print(f"{str(i + 1).rjust(just)}. {item.name} ({item.stack}/{item.max_stack})")
                             print((" " * (just + 2)) + "[" + ", ".join(map(str.capitalize, item.tags)) + "]\n")
@@ -365,12 +367,9 @@ class Game:
         """
         print(self.player.detailedBattleDescription())
         print("Inventory: ")
-        index_of_inventory: int = 0
-        for i, component in enumerate(self.player.components):
-            if isinstance(component, Inventory):
-                index_of_inventory = i
-        just = len(str(len(cast(Inventory, self.player.components[index_of_inventory]).items)))
-        for i, item in enumerate(cast(Inventory, self.player.components[index_of_inventory]).items):
+        inventory = cast(Inventory, self.getInventory())
+        just = len(str(len(inventory.items)))
+        for i, item in enumerate(inventory.items):
             print(f"{str(i + 1).rjust(just)}. {item} - {item.description if item != None else None}")
         print("\nAbilities: ")
         just = len(str(len(self.player.actions)))
@@ -416,44 +415,42 @@ class Game:
     def displayInspectItem(self):
         """Displays item information for the inspect item menu.
         """
-        for component in self.player.components:
-            if isinstance(component, Inventory):
-                item = cast(ItemInstance, component.getItem(self.retrieveDataFromCache("item_index")()))
-                print()
-                print(f"{item.name} ({item.stack}/{item.max_stack})")
-                print("[" + ", ".join(map(str.capitalize, item.tags)) + "]\n")
-                print(item.description)
-                print()
-                print("1) Uses")
-                print("2) Back\n")
-                return
+        inventory = self.getInventory()
+        if inventory is not None:
+            item = cast(ItemInstance, inventory.getItem(self.retrieveDataFromCache("item_index")()))
+            print()
+            print(f"{item.name} ({item.stack}/{item.max_stack})")
+            print("[" + ", ".join(map(str.capitalize, item.tags)) + "]\n")
+            print(item.description)
+            print()
+            print("1) Uses")
+            print("2) Back\n")
 
     def inputInspectItem(self) -> None:
         """Handles input for item inspection menu.
         """
         choice: int = intput("Choice: ") - 1
         if choice == 0:
-            for component in self.player.components:
-                if isinstance(component, Inventory):
-                    item: ItemInstance = cast(ItemInstance, component.getItem(self.retrieveDataFromCache("item_index")()))
-                    uses: list[AbilityInstance] = [AbilityInstance(self.ability_types[data]) for data in item.getType().uses]
-                    just = len(str(len(uses)))
-                    for i, use in enumerate(uses):
-                        print(f"{str(i + 1).rjust(just)}) {use.getType().name} - {use.getType().description}")
-                    print(f"{str(len(uses) + 1).rjust(just)}) Back\n")
-                    while True:
-                        choice = intput("Option: ") - 1
-                        if choice == len(uses):
-                            break
-                        elif 0 <= choice < len(uses):
-                            if not uses[choice].canApply([self.player, item]):
-                                print("You can not use that item like that right now.\n")
-                            else:
-                                uses[choice].apply([self.player, item])
-                                if item.stack == 0:
-                                    component.items[self.popDataFromCache("item_index")()] = None
-                                    self.popMenu()
-                                break
+            item_index: int = self.retrieveDataFromCache("item_index")()
+            item: ItemInstance = cast(ItemInstance, cast(Inventory, self.getInventory()).getItem(item_index))
+            uses: list[AbilityInstance] = [AbilityInstance(self.ability_types[data]) for data in item.getType().uses]
+            just = len(str(len(uses)))
+            for i, use in enumerate(uses):
+                print(f"{str(i + 1).rjust(just)}) {use.getType().name} - {use.getType().description}")
+            print(f"{str(len(uses) + 1).rjust(just)}) Back\n")
+            while True:
+                choice = intput("Option: ") - 1
+                if choice == len(uses):
+                    break
+                elif 0 <= choice < len(uses):
+                    result = self.applyItemUse(item_index, choice)
+                    if not result["ok"]:
+                        print("You can not use that item like that right now.\n")
+                    else:
+                        if item.stack == 0:
+                            self.popDataFromCache("item_index")()
+                            self.popMenu()
+                        break
         elif choice == 1:
             self.popDataFromCache("item_index")()
             self.popMenu()
@@ -473,16 +470,9 @@ class Game:
         """
         option: int = intput("Option: ") - 1
         if option == 0: 
-            class_doota: ClassType = self.class_types[self.retrieveDataFromCache("class_type")()]
-            xp_cost: int = self.player.nextXPInClass(class_doota)
-            if xp_cost == -1:
-                print("You are already max level.\n")
-            elif self.player.xp < xp_cost:
-                print("You lack the neccessary XP to take a level in this class.\n")
-            else:
-                self.player.xp -= xp_cost
-                self.player.gainClassLevel(class_doota, self.ability_types)
-                print(f"You have gained one level in {class_doota.name}.\n")
+            result = self.levelUp(self.retrieveDataFromCache("class_type")())
+            print(result["message"])
+            if result["ok"]:
                 input()
                 self.popMenu()
         elif option == 1:
@@ -491,24 +481,12 @@ class Game:
     def createCharacter(self) -> None:
         """Creates the player character.
         """
-        self.player.name = self.popDataFromCache("character_name")()
-        self.player.max_hp = 100
-        self.player.hp = 100
-        self.player.components.append(Inventory(12))
-        self.player.components.append(FunctionHolder(None, self.combatMenu))
-        self.player.gainClassLevel(
-            self.class_types[self.popDataFromCache("character_class")()],
-            self.ability_types,
-        )
-        self.player.faction = "player"
-        self.map.setRoom(0, 0, "starting_room")
+        result = self.startGame(self.popDataFromCache("character_name")(), self.popDataFromCache("character_class")())
+        if not result["ok"]:
+            print(result["message"])
+            return
         print("Use 'help' to see a list of valid commands.")
 
-    def mods(self) -> dict:
-        """Returns the mods.
-        """
-        return self.__mods
-
     def update(self):
         """Update the game, and menu's.
         """
@@ -525,111 +503,6 @@ class Game:
         """
         return self.class_types
 
-    def getMods(self):
-        """Gets mods from the mods directory.
-        """
-        for file in os.scandir("mods"):
-            if file.is_dir() and os.path.exists(file.path + "/mod.json"):
-                self.__mods[file.name] = False
-                with open(file.path + "/mod.json", "r") as f:
-                    mod_data = json.load(f)
-                    if "default_to_on" in mod_data:
-                        self.__mods[file.name] = mod_data["default_to_on"]
-
-    def reloadWithActiveMods(self):
-        """Reloads the game with active mods.
-        """
-        mods = [f"mods/{key}" for key, value in self.__mods.items() if value]
-        for mod in mods:
-            self.loadMod(mod)
-        self.rebuildMenus()
-
-    def loadMod(self, path: str) -> None:
-        """Loads all mods in the specified directory.
-        """
-        for file in os.scandir(path):
-            if file.is_dir() and file.name in [
-                "classes",
-                "entities",
-                "items",
-                "rooms",
-                "abilities",
-                "spawn_pools",
-                "room_pools",
-                "factions",
-            ]:
-                if file.name == "classes":
-                    #print("Classes is present.")
-                    for class_json in os.scandir(path + "/classes"):
-                        if class_json.is_file() and class_json.name[-5:] == ".json":
-                            with open(class_json.path, "r") as f:
-                                self.class_types[class_json.name[:-5]] = (
-                                    ClassType.fromDict(self, class_json.name[:-5], json.load(f))
-                                )
-                elif file.name == "entities":
-                    #print("Entities is present.")
-                    for entity_json in os.scandir(path + "/entities"):
-                        if entity_json.is_file() and entity_json.name[-5:] == ".json":
-                            with open(entity_json.path, "r") as f:
-                                self.entity_types[entity_json.name[:-5]] = (
-                                    EntityType.fromDict(
-                                        entity_json.name[:-5], json.load(f)
-                                    )
-                                )
-                elif file.name == "items":
-                    #print("Items is present.")
-                    for item_json in os.scandir(path + "/items"):
-                        if item_json.is_file() and item_json.name[-5:] == ".json":
-                            with open(item_json.path, "r") as f:
-                                self.item_types[item_json.name[:-5]] = (
-                                    ItemType.fromDict(item_json.name[:-5], json.load(f))
-                                )
-                elif file.name == "rooms":
-                    #print("Rooms is present.")
-                    for room_json in os.scandir(path + "/rooms"):
-                        if room_json.is_file() and room_json.name[-5:] == ".json":
-                            with open(room_json.path, "r") as f:
-                                self.map.room_types[room_json.name[:-5]] = (
-                                    RoomType.fromDict(room_json.name[:-5], json.load(f))
-                                )
-                elif file.name == "abilities":
-                    #print("Abilities is present.")
-                    for ability_json in os.scandir(path + "/abilities"):
-                        if ability_json.is_file() and ability_json.name[-5:] == ".json":
-                            with open(ability_json.path, "r") as f:
-                                self.ability_types[ability_json.name[:-5]] = (
-                                    AbilityType.fromDict(
-                                        self, ability_json.name[:-5], json.load(f)
-                                    )
-                                )
-                elif file.name == "room_pools":
-                    #print("Room Pools is present.")
-                    for room_pool_json in os.scandir(path + "/room_pools"):
-                        if room_pool_json.is_file() and room_pool_json.name[-5:] == ".json":
-                            with open(room_pool_json.path, "r") as f:
-                                self.map.addRoomPool(RoomPool.fromDict(self, room_pool_json.name[:-5], json.load(f)))
-                elif file.name == "factions":
-                    #print("Factions is present.")
-                    for faction_json in os.scandir(path + "/factions"):
-                        if faction_json.is_file() and faction_json.name[-5:] == ".json":
-                            with open(faction_json.path, "r") as f:
-                                data_f: dict[str, Any] = json.load(f)
-                                self.factions[faction_json.name[:-5]] = (Faction.fromDict(faction_json.name[:-5], data_f))
-                                if "player" in data_f["hostile"]:
-                                    self.factions["player"].hostile.append(faction_json.name[:-5])
-                elif file.name == "spawn_pools":
-                    #print("Spawn Pools is present.")
-                    for spawn_pool_json in os.scandir(path + "/spawn_pools"):
-                        if spawn_pool_json.is_file() and spawn_pool_json.name[-5:] == ".json":
-                            with open(spawn_pool_json.path, "r") as f:
-                                self.map.spawn_pool_types[spawn_pool_json.name[:-5]] = SpawnPool.fromDict(self, spawn_pool_json.name[:-5], json.load(f))
-
-    def swapEnable(self, index: int) -> None:
-        """Switches the enabled status of a mod.
-        """
-        key: str = list(self.__mods.keys())[index]
-        self.__mods[key] = not self.__mods[key]
-
     def addMenu(self, menu_name: str) -> Callable[[], None]:
         """Add a menu to the menu stack.
         """
@@ -670,12 +543,6 @@ class Game:
         
         return toReturn
 
-    def clearData(self) -> None:
-        """Clear data that is instance based.
-        """
-        self.player = EntityInstance(self, EntityInstance.NULL_ENTITY_TYPE)
-        self.map.reset()
-
     def popMenu(self) -> None:
         """Pop the menu on the top of the stack.
         """
@@ -685,9 +552,7 @@ class Game:
         """Displays the dungeon combat menu.
         """
         if not self.hasDataInCache("waiting_for_turn")() or not self.retrieveDataFromCache("waiting_for_turn")():
-            room: RoomInstance = cast(RoomInstance, self.map.getRoom(self.player_x, self.player_y))
-            room.update()
-            self.battle_manager.updateBattles(self)
+            self.tick()
 
     def inputDungeonCombat(self) -> None: 
         """Handles input for the dungeon combat menu.
@@ -736,7 +601,7 @@ class Game:
     def inputListCreatures(self) -> None:
         """Handles input for the creature inspection menu.
         """
-        creatures = self.battle_manager.battles[self.player.getData("in_battle")].participants
+        creatures = self.getBattleParticipants()
         choice = intput("Choice: ") - 1
         if choice == len(creatures):
             self.popMenu()
@@ -748,7 +613,7 @@ class Game:
     def displayListCreatures(self) -> None:
         """Displays a list of creatures to be inspected.
         """
-        creatures = self.battle_manager.battles[self.player.getData("in_battle")].participants
+        creatures = self.getBattleParticipants()
         just = len(str(len(creatures)))
         for i, creature in enumerate(creatures):
             print(f"{str(i + 1).rjust(just)}) {creature.name}")
@@ -764,24 +629,16 @@ class Game:
             self.popMenu()
         elif 0 <= choice < len(actions):
             action = self.player.actions[choice]
-            action_type = dummyFindActionType(self.player, action)
+            action_type = action.getType().category
             #print(action_type)
-            if action_type == "self_heal":
-                if not action.canApply([self.player]):
-                    print("You can not use that action right now.\n")
-                    return
-                action.apply([self.player])
-                self.popDataFromCache("waiting_for_turn")()
-                input()
-                self.popMenu()
-            elif action_type in ["other_heal", "other_damage"]:
+            if action_type in ["other_heal", "other_damage"]:
                 self.saveDataToCache("ability_index")(choice)
                 self.addMenu("target_select")()
             else:
-                if not action.canApply([self.player]):
-                    print("You can not use that action right now.\n")
+                result = self.applyAction(choice)
+                print(result["message"])
+                if not result["ok"]:
                     return
-                action.apply([self.player])
                 self.popDataFromCache("waiting_for_turn")()
                 input()
                 self.popMenu()
@@ -797,21 +654,15 @@ class Game:
     def inputListItems(self) -> None:
         """Handles input for the items menu.
         """
-        index_of_inventory = 0
-        for i, component in enumerate(self.player.components):
-            if isinstance(component, Inventory):
-                index_of_inventory = i
-        
-        items = cast(Inventory, self.player.components[index_of_inventory]).items
-        choice = intput("Choice: ") - 1
-        if choice == len(items):
+        items = cast(Inventory, self.getInventory()).items
+        slot = intput("Choice: ") - 1
+        if slot == len(items):
             self.popMenu()
-        elif 0 <= choice < len(items):
-            stack = items[choice]
+        elif 0 <= slot < len(items):
+            stack = items[slot]
             if stack == None or len(stack.getType().uses) <= 0:
                 print("That item has no uses.\n")
                 return
-            index = 0
             uses = [AbilityInstance(self.ability_types[data]) for data in stack.getType().uses]
             for i, use in enumerate(uses):
                 print(f"{i + 1}) {use.getType().name} - {use.getType().description}")
@@ -821,23 +672,19 @@ class Game:
                 if choice == len(uses):
                     break
                 elif 0 <= choice < len(uses):
-                    self.saveDataToCache("item_ability")(stack.getType().uses[index])
-                    action = AbilityInstance(self.ability_types[self.retrieveDataFromCache("item_ability")()])
-                    if "creature" in action.getType().targets:
-                        self.saveDataToCache("item_index")(choice)
+                    if "creature" in uses[choice].getType().targets:
+                        self.saveDataToCache("item_ability")(choice)
+                        self.saveDataToCache("item_index")(slot)
                         self.addMenu("target_select")()
                         break
                     else:
-                        if not action.canApply([self.player, stack]):
-                            print("You can not use that action right now.\n")
+                        result = self.applyItemUse(slot, choice)
+                        if not result["ok"]:
+                            print(result["message"])
                             continue
-                        action.apply([self.player, stack])
-                        if stack.stack == 0:
-                            items[choice] = None
                         print()
-                        print(f"{self.player.name} used {stack.name}.")
+                        print(result["message"])
                         print()
-                        self.popDataFromCache("item_ability")
                         self.popDataFromCache("waiting_for_turn")()
                         self.popMenu()
                         break
@@ -845,61 +692,40 @@ class Game:
     def displayListItems(self) -> None:
         """Displays a list of items in the players inventory.
         """
-        index_of_inventory = 0
-        for i, component in enumerate(self.player.components):
-            if isinstance(component, Inventory):
-                index_of_inventory = i
-
-        just = len(str(len(cast(Inventory, self.player.components[index_of_inventory]).items)))
-        for i, item in enumerate(cast(Inventory, self.player.components[index_of_inventory]).items):
+        items = cast(Inventory, self.getInventory()).items
+        just = len(str(len(items)))
+        for i, item in enumerate(items):
             if item != None:
                 print(f"{str(i + 1).rjust(just)}) {item}")
-        print(f"{str(len(cast(Inventory, self.player.components[index_of_inventory]).items) + 1).rjust(just)}) Back\n")
+        print(f"{str(len(items) + 1).rjust(just)}) Back\n")
     
     def inputTargets(self) -> None:
         """Handles input for targets menu.
         """
-        creatures: list[EntityInstance] = self.battle_manager.battles[self.player.getData("in_battle")].participants
+        creatures: list[EntityInstance] = self.getBattleParticipants()
         choice: int = intput("Choice: ") - 1
         if choice == len(creatures):
             self.popMenu()
         elif 0 <= choice < len(creatures):
             if self.hasDataInCache("ability_index")():
-                ability: AbilityInstance = self.player.actions[self.popDataFromCache("ability_index")()]
-                if not ability.canApply([self.player, creatures[choice]]):
-                    print("You can not use that action on that target right now.\n")
-                    return
-                calc: int = creatures[choice].hp
-                ability.apply([self.player, creatures[choice]])
-                calc -= creatures[choice].hp
-                self.popDataFromCache("waiting_for_turn")()
-                print()
-                print(f"{self.player.name} used {ability.getType().name} on {creatures[choice].name} for {calc} damage.")
-                self.popMenu()
-                self.popMenu()
+                result = self.applyAction(self.popDataFromCache("ability_index")(), choice)
             elif self.hasDataInCache("item_index")():
-                ability: AbilityInstance = AbilityInstance(self.ability_types[self.popDataFromCache("item_ability")()])
-                index_of_inventory: int = 0
-                for i, component in enumerate(self.player.components):
-                    if isinstance(component, Inventory):
-                        index_of_inventory = i
-                stack = cast(Inventory, self.player.components[index_of_inventory]).items[self.popDataFromCache("item_index")()]
-                if not ability.canApply([self.player, stack, creatures[choice]]):
-                    print("You can not use that action on that target right now.\n")
-                    return
-                calc: int = creatures[choice].hp
-                ability.apply([self.player, stack, creatures[choice]])
-                calc -= creatures[choice].hp
-                self.popDataFromCache("waiting_for_turn")()
-                print()
-                print(f"{self.player.name} used {ability.getType().name} on {creatures[choice].name} for {calc} damage.")
-                self.popMenu()
-                self.popMenu()
+                result = self.applyItemUse(self.popDataFromCache("item_index")(), self.popDataFromCache("item_ability")(), choice)
+            else:
+                return
+            if not result["ok"]:
+                print(result["message"])
+                return
+            self.popDataFromCache("waiting_for_turn")()
+            print()
+            print(result["message"])
+            self.popMenu()
+            self.popMenu()
     
     def displayTargets(self) -> None:
         """Displays list of creatures that can be targeted.
         """
-        creatures: list[EntityInstance] = self.battle_manager.battles[self.player.getData("in_battle")].participants
+        creatures: list[EntityInstance] = self.getBattleParticipants()
         just = len(str(len(creatures)))
         for i, creature in enumerate(creatures):
             print(f"{str(i + 1).rjust(just)}) {creature.name} - ")
@@ -928,61 +754,44 @@ class Game:
                 save_name: str = " _ "
                 while not save_name.replace("_", "u").isalnum():
                     save_name = input("Save Name (Alpha numeric to avoid crashes): ")
-                with open(f"saves/{save_name}.json", "w") as f:
-                    json.dump(self.saveToDict(), f)
-                print("Game saved.")
+                print(self.save(save_name)["message"])
                 return
             case "quit":
                 self.popMenu()
-                self.clearData()
+                self.quit()
                 return
             case "look":
-                print(room.getDescription())
+                print(self.look()["message"])
+                return
             case "interact":
                 if len(command) < 2:
                     print("You need to add what to interact with.\n")
                 else:
                     interaction_input: str = " ".join(command[1::])
-                    for interactable in room.interactables:
-                        if interactable.name == interaction_input:
-                            interactions: list[AbilityInstance] = [AbilityInstance(self.ability_types[data]) for data in interactable.uses]
-                            just: int = len(str(len(interactions)))
-                            for i, interaction in enumerate(interactions):
-                                print(f"{str(i + 1).rjust(just)}) {interaction.getType().name} - {interaction.getType().description}")
-                            print(f"{str(len(interactions) + 1).rjust(just)}) Back\n")
-                            while True:
-                                choice: int = intput("Option: ") - 1
-                                if choice == len(interactions):
-                                    break
-                                elif 0 <= choice < len(interactions):
-                                    if not interactions[choice].canApply([self.player, interactable, room]):
-                                        print("You can not do that interaction right now.\n")
-                                    else:
-                                        interactions[choice].apply([self.player, interactable, room])
-                                        break
+                    found = self.getInteractions(interaction_input)
+                    if found != None:
+                        interactions: list[AbilityInstance] = found[1]
+                        just: int = len(str(len(interactions)))
+                        for i, interaction in enumerate(interactions):
+                            print(f"{str(i + 1).rjust(just)}) {interaction.getType().name} - {interaction.getType().description}")
+                        print(f"{str(len(interactions) + 1).rjust(just)}) Back\n")
+                        while True:
+                            choice: int = intput("Option: ") - 1
+                            if choice == len(interactions):
+                                break
+                            elif 0 <= choice < len(interactions):
+                                result = self.interact(interaction_input, choice)
+                                if result["ok"]:
+                                    return
+                                print(result["message"])
             case "move":
                 if len(command) < 2:
                     print("Add a direction to move in.\n")
                 else:
-                    direction: str = command[1]
-                    if direction == "north":
-                        self.player_y += 1
-                    elif direction == "south":
-                        self.player_y -= 1
-                    elif direction == "east":
-                        self.player_x += 1
-                    elif direction == "west":
-                        self.player_x -= 1
-                    room = cast(RoomInstance, self.map.getRoom(self.player_x, self.player_y))
-                    if room == None: 
-                        if direction == "north":
-                            self.player_y += -1
-                        elif direction == "south":
-                            self.player_y -= -1
-                        elif direction == "east":
-                            self.player_x += -1
-                        elif direction == "west":
-                            self.player_x -= -1
+                    result = self.move(command[1])
+                    if result["ok"]:
+                        return
+                    print(result["message"])
             case "character":
                 self.addMenu("character_sheet")()
                 return
@@ -995,24 +804,15 @@ class Game:
                 print("interact (name of interactable) - Opens the interaction menu for an interactable in the current room.")
                 print("character - Opens the character sheet.")
 
-        room = cast(RoomInstance, self.map.getRoom(self.player_x, self.player_y))
-        room.update()
-        self.battle_manager.updateBattles(self)
+        self.tick()
 
     def loadFromDict(self, data) -> None:
         """Loads a game state from a dictionary.
         """
-        self.player = EntityInstance.fromDict(data["player"], self)
-        self.player.components.remove(None) # pyright: ignore
-        self.player.components.append(FunctionHolder(None, self.combatMenu))
-        self.player_x = data["player_x"]
-        self.player_y = data["player_y"]
-        self.map.loadFromDict(data["map"], self)
-        self.battle_manager = BattleManager.fromDict(data["battle_manager"], self)
-        self.player.battleLoad()
-        self.map.battleLoad()
+        super().loadFromDict(data)
+        menu_stack = [MenuInstance(self.menus[entry]) for entry in data["menu_stack"]]
         self.menu_cache = data["menu_cache"]
-        self.menu_stack = [MenuInstance(self.menus[entry]) for entry in data["menu_stack"]]
+        self.menu_stack = menu_stack
 
     def findMenuString(self, menu: MenuInstance) -> str:
         """Searches for a key from the menu type in menus.
@@ -1026,12 +826,7 @@ class Game:
     def saveToDict(self) -> dict[str, Any]:
         """Saves game to a dictionary.
         """
-        return {
-            "player": self.player.toDict(),
-            "player_x": self.player_x,
-            "player_y": self.player_y,
-            "map": self.map.toDict(),
-            "battle_manager": self.battle_manager.toDict(),
-            "menu_cache": self.menu_cache,
-            "menu_stack": list(map(self.findMenuString, self.menu_stack))
-        }
+        data = super().saveToDict()
+        data["menu_cache"] = self.menu_cache
+        data["menu_stack"] = list(map(self.findMenuString, self.menu_stack))
+        return data
@@ -1,11 +1,11 @@
-from typing import Any, Self
+from typing import Any, Optional, Self, Sequence
 
 class ItemType:
     def __init__(self, id: str, name: str, description: str, tags: list[str], stack: int, uses):
         self.id: str = id
         self.name: str = name
         self.description: str = description
-        self.tags: list[str] = tags
+        self.tags: tuple[str, ...] = tuple(tags)
         self.stack: int = stack
         self.uses = uses
         
@@ -17,14 +17,47 @@ class ItemType:
         return item
 
 class ItemInstance:
+    """A stack of items, change its stack with changeStack.
+    """
+    __slots__ = ("__item_type", "__name", "__description", "__tags", "stack", "data", "inventory", "slot")
+
     def __init__(self, item_type: ItemType):
         self.__item_type: ItemType = item_type
-        self.name: str = self.__item_type.name
-        self.description: str = self.__item_type.description
-        self.tags: list[str] = self.__item_type.tags
-        self.max_stack: int = self.__item_type.stack
+        self.__name: str | None = None
+        self.__description: str | None = None
+        self.__tags: list[str] | None = None
         self.stack: int = 1
         self.data: dict[str, Any] = {}
+        self.inventory: Optional[Any] = None
+        self.slot: int = -1
+
+    @property
+    def name(self) -> str:
+        return self.__item_type.name if self.__name is None else self.__name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self.__name = value
+
+    @property
+    def description(self) -> str:
+        return self.__item_type.description if self.__description is None else self.__description
+
+    @description.setter
+    def description(self, value: str) -> None:
+        self.__description = value
+
+    @property
+    def tags(self) -> Sequence[str]:
+        return self.__item_type.tags if self.__tags is None else self.__tags
+
+    @tags.setter
+    def tags(self, value: Sequence[str]) -> None:
+        self.__tags = list(value)
+
+    @property
+    def max_stack(self) -> int:
+        return self.__item_type.stack
     
     def __repr__(self) -> str:
         return f"{self.stack}x {self.name}"
@@ -35,12 +68,31 @@ class ItemInstance:
         return self.__item_type
     
     def changeStack(self, amount: int) -> None:
-        """Add a stack to the item.
+        """Add a stack to the item, the inventory holding it hears about the change.
         """
+        previous = self.stack
         self.stack = min(max(self.stack + amount, 0), self.max_stack)
-        if self.stack == 0:
-            self = None
+        if self.inventory is not None and self.stack != previous:
+            self.inventory.stackChanged(self, previous)
     
+    def clone(self, inventory: Optional[Any] = None, slot: int = -1, pools: Optional[Any] = None) -> "ItemInstance":
+        """Copy the item into a slot of an inventory or none, its data dictionary is copied shallowly.
+
+        The copy is a free item from pools when there is one.
+        """
+        item = pools.take(ItemInstance) if pools is not None else None
+        if item is None:
+            item = ItemInstance.__new__(ItemInstance)
+        item.__item_type = self.__item_type
+        item.__name = self.__name
+        item.__description = self.__description
+        item.__tags = None if self.__tags is None else self.__tags.copy()
+        item.stack = self.stack
+        item.data = self.data.copy()
+        item.inventory = inventory
+        item.slot = slot
+        return item
+
     def canAddStack(self, item) -> bool:
         """If you can add a stack to an item.
         """
@@ -50,12 +102,13 @@ class ItemInstance:
     def fromDict(cls, data: dict[str, Any], item_types: dict[str, ItemType]):
         """Makes an item instance from a dict.
         """
-        item: ItemInstance = cls(item_types[data["type"]])
-        if "name" in data:
+        item_type: ItemType = item_types[data["type"]]
+        item: ItemInstance = cls(item_type)
+        if "name" in data and data["name"] != item_type.name:
             item.name = data["name"]
-        if "description" in data:
+        if "description" in data and data["description"] != item_type.description:
             item.description = data["description"]
-        if "tags" in data:
+        if "tags" in data and tuple(data["tags"]) != item_type.tags:
             item.tags = data["tags"]
         if "stack" in data:
             item.stack = data["stack"]
@@ -70,7 +123,7 @@ class ItemInstance:
             "type": self.__item_type.id,
             "name": self.name,
             "description": self.description,
-            "tags": self.tags,
+            "tags": list(self.tags),
             "stack": self.stack,
             "data": self.data
         }
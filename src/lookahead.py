@@ -0,0 +1,282 @@
+from .decay import DecayingData
+from typing import Any, Optional, Self
+import math, random, time
+
+# How much UCT favours trying moves that have been visited less.
+EXPLORATION: float = 1.4
+
+
+class SimulatedCreature:
+    """A battle participant in a BattleState, effect scripts run on it the same as on an entity.
+    """
+    __slots__ = ("hp", "max_hp", "xp", "faction_id", "data", "actions", "out")
+
+    components = ()
+
+    def __init__(self, hp: int, max_hp: int, xp: int, faction_id: int, data: DecayingData, actions: tuple):
+        self.hp = hp
+        self.max_hp = max_hp
+        self.xp = xp
+        self.faction_id = faction_id
+        self.data = data
+        # The entity's AbilityInstances, shared by every clone.
+        self.actions = actions
+        # Dead or fled.
+        self.out = False
+
+    @classmethod
+    def fromEntity(cls, entity) -> Self:
+        """Make a simulated creature from an entity.
+        """
+        return cls(entity.hp, entity.max_hp, entity.xp, entity.faction_id, entity.data.copy(), tuple(entity.actions))
+
+    def getComponents(self, component_class: type) -> list[Any]:
+        """Get the creature's components of a class, there are none so scripts that give items do nothing.
+        """
+        return []
+
+    def clone(self) -> Self:
+        """Copy the creature, the actions are shared.
+        """
+        creature = SimulatedCreature(self.hp, self.max_hp, self.xp, self.faction_id, self.data.copy(), self.actions)
+        creature.out = self.out
+        return creature
+
+    def changeHP(self, amount: int, respect_cap: bool) -> bool:
+        """Change the creature's hp the way EntityInstance.changeHP does.
+        """
+        pre_hp = max(self.hp, self.max_hp)
+        self.hp = max(self.hp + amount, 0)
+        if respect_cap:
+            self.hp = min(self.hp, pre_hp)
+        if self.hp == 0:
+            self.out = True
+            return True
+        return False
+
+    def addXP(self, amount: int) -> None:
+        """Add xp to the creature.
+        """
+        self.xp += amount
+
+    def flee(self) -> None:
+        """Leave the simulated battle.
+        """
+        self.out = True
+
+    def changeRoom(self, x, y) -> None:
+        """Leave the simulated battle, like fleeing.
+        """
+        self.out = True
+
+    def hasData(self, key):
+        """Check if creature has data of a key.
+        """
+        return key in self.data
+
+    def getData(self, key):
+        """Get data from the creature.
+        """
+        return self.data.value(key)
+
+    def addData(self, key, value, decay):
+        """Add data to the creature with decay, -1 for no decay.
+        """
+        self.data.set(key, value, decay)
+
+    def removeData(self, key):
+        """Remove data from the creature.
+        """
+        self.data.pop(key)
+
+    def decayData(self) -> None:
+        """Count down the creature's data the way EntityInstance.update does.
+        """
+        self.data.tick()
+
+
+class BattleState:
+    """The hp, data and actions of everyone in a battle, cheap to copy and step forward.
+
+    Creatures are kept in turn order. A move is an (action index, target index) pair, the
+    target index is None for actions that only target their consumer. A move of None passes.
+    """
+    __slots__ = ("creatures", "hostility", "turn")
+
+    def __init__(self, creatures: list[SimulatedCreature], hostility: list[int], turn: int):
+        self.creatures = creatures
+        # The faction table's hostility bitsets, shared by every clone.
+        self.hostility = hostility
+        # The index of the creature whose turn it is.
+        self.turn = turn
+
+    @classmethod
+    def fromBattle(cls, battle, entity) -> tuple[Self, list[Any]]:
+        """Get the state of a battle on an entity's turn, with the entities in the same order as the creatures.
+
+        Dying participants are left out, except the entity, which still gets its turn.
+        """
+        entities = [participant for participant in battle.turn_order if participant is entity or not participant.to_die]
+        creatures = [SimulatedCreature.fromEntity(participant) for participant in entities]
+        return cls(creatures, entity.game.faction_table.hostility, entities.index(entity)), entities
+
+    def clone(self) -> Self:
+        """Copy the state, the creatures are copied and the rest is shared.
+        """
+        return BattleState([creature.clone() for creature in self.creatures], self.hostility, self.turn)
+
+    def isHostile(self, first: int, second: int) -> bool:
+        """Check if the creature at first is hostile to the one at second.
+        """
+        return (self.hostility[self.creatures[first].faction_id] >> self.creatures[second].faction_id) & 1 == 1
+
+    def isOver(self) -> bool:
+        """Check if no creature left is hostile to another one left.
+        """
+        factions = {creature.faction_id for creature in self.creatures if not creature.out}
+        return not any((self.hostility[faction] >> other) & 1 for faction in factions for other in factions)
+
+    def moves(self) -> list[tuple[int, Optional[int]]]:
+        """Get the moves the creature whose turn it is can make.
+
+        Damaging and utility actions target hostile creatures and healing ones target the rest.
+        """
+        actor = self.creatures[self.turn]
+        moves: list[tuple[int, Optional[int]]] = []
+        for i, action in enumerate(actor.actions):
+            ability_type = action.getType()
+            if ability_type.targets == ["consumer"]:
+                if action.canApply([actor]):
+                    moves.append((i, None))
+            elif len(ability_type.targets) == 2 and set(ability_type.targets) == {"consumer", "creature"} and action.consumerCanApply(actor, 2):
+                wants_hostile = ability_type.category != "other_heal"
+                for j, creature in enumerate(self.creatures):
+                    if not creature.out and self.isHostile(self.turn, j) == wants_hostile and action.targetsCanApply([actor, creature]):
+                        moves.append((i, j))
+        return moves
+
+    def apply(self, move: Optional[tuple[int, Optional[int]]]) -> None:
+        """Make a move for the creature whose turn it is and pass the turn on.
+        """
+        if move is not None:
+            actor = self.creatures[self.turn]
+            action_index, target_index = move
+            actor.actions[action_index].apply([actor] if target_index is None else [actor, self.creatures[target_index]])
+        self.passTurn()
+
+    def passTurn(self) -> None:
+        """Pass the turn to the next creature left, data counts down when a new round starts.
+        """
+        for _ in range(len(self.creatures)):
+            self.turn += 1
+            if self.turn == len(self.creatures):
+                self.turn = 0
+                for creature in self.creatures:
+                    creature.decayData()
+            if not self.creatures[self.turn].out:
+                return
+
+    def rollout(self, turns: int) -> None:
+        """Play random moves until the battle is over or the turns run out.
+        """
+        for _ in range(turns):
+            if self.isOver():
+                return
+            moves = self.moves()
+            self.apply(random.choice(moves) if len(moves) > 0 else None)
+
+    def score(self, side: int) -> float:
+        """Score the state for the side of the creature at side between 0 and 1.
+
+        It is how much hp the side has kept as a share of its max hp against how much the
+        creatures hostile to it have kept.
+        """
+        ally_hp = ally_max_hp = hostile_hp = hostile_max_hp = 0
+        for i, creature in enumerate(self.creatures):
+            if self.isHostile(side, i):
+                hostile_hp += creature.hp
+                hostile_max_hp += creature.max_hp
+            else:
+                ally_hp += creature.hp
+                ally_max_hp += creature.max_hp
+        ally = ally_hp / ally_max_hp if ally_max_hp > 0 else 0
+        hostile = hostile_hp / hostile_max_hp if hostile_max_hp > 0 else 0
+        return (1 + ally - hostile) / 2
+
+
+class SearchNode:
+    __slots__ = ("move", "actor", "parent", "children", "untried", "visits", "value")
+
+    def __init__(self, move: Optional[tuple[int, Optional[int]]], actor: int, parent: Optional["SearchNode"]):
+        # None for the root and for passing.
+        self.move = move
+        # The creature that made the move leading here, the value is from its side.
+        self.actor = actor
+        self.parent = parent
+        self.children: list[SearchNode] = []
+        self.untried: Optional[list[tuple[int, Optional[int]]]] = None
+        self.visits = 0
+        self.value = 0.0
+
+    def select(self) -> "SearchNode":
+        """Pick the child with the best upper confidence bound.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.value / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits))
+
+
+def searchMove(battle, entity, settings: dict[str, Any]) -> Optional[tuple[Any, Optional[Any]]]:
+    """Run Monte Carlo tree search from an entity's turn in a battle and return its (action, target).
+
+    settings has the milliseconds to search for (10 if not given) and the rollout_turns each
+    rollout plays (30 if not given). With iterations in settings, or the game's
+    search_iterations, the search runs that many rollouts instead of until the time is up, so
+    the move it picks doesn't depend on how busy the machine is. The target is None for
+    actions that only target the entity. Returns None if the entity has no moves. The random
+    state is put back afterwards so searching doesn't change the game's.
+    """
+    root_state, entities = BattleState.fromBattle(battle, entity)
+    me = root_state.turn
+    root_moves = root_state.moves()
+    if len(root_moves) == 0:
+        return None
+    if len(root_moves) == 1:
+        move = root_moves[0]
+    else:
+        rollout_turns = settings.get("rollout_turns", 30)
+        iterations: Optional[int] = settings.get("iterations", entity.game.search_iterations)
+        deadline = time.perf_counter() + settings.get("milliseconds", 10) / 1000
+        random_state = random.getstate()
+        root = SearchNode(None, me, None)
+        root.untried = root_moves
+        done = 0
+        while done < iterations if iterations is not None else time.perf_counter() < deadline:
+            done += 1
+            node = root
+            state = root_state.clone()
+            # Select down to a node with moves left to try.
+            while node.untried is not None and len(node.untried) == 0 and len(node.children) > 0:
+                node = node.select()
+                state.apply(node.move)
+            # Expand one of them.
+            if node.untried is None:
+                node.untried = (state.moves() or [None]) if not state.isOver() else []
+            if len(node.untried) > 0:
+                actor = state.turn
+                move = node.untried.pop(random.randrange(len(node.untried)))
+                state.apply(move)
+                child = SearchNode(move, actor, node)
+                node.children.append(child)
+                node = child
+            state.rollout(rollout_turns)
+            result = state.score(me)
+            while node is not None:
+                node.visits += 1
+                node.value += 1 - result if root_state.isHostile(me, node.actor) else result
+                node = node.parent
+        random.setstate(random_state)
+        if len(root.children) == 0:
+            return None
+        move = max(root.children, key=lambda child: child.visits).move
+    action_index, target_index = move
+    return entity.actions[action_index], (entities[target_index] if target_index is not None else None)
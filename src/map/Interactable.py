@@ -1,7 +1,17 @@
 from typing import Any
+import itertools
 
 class Interactable:
+    """Something in a room the player can interact with.
+
+    serial is different for every interactable made, a pooled one gets a new serial when it is
+    reused, so it tells interactables apart where id would not.
+    """
+    __slots__ = ("name", "description", "tags", "uses", "data", "serial")
+    serials = itertools.count()
+
     def __init__(self, name: str, description: str, tags: list[str], uses, data: dict[str, Any]):
+        self.serial: int = next(Interactable.serials)
         self.name: str = name
         self.description: str = description
         self.tags: list[str] = tags
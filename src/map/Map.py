@@ -7,12 +7,15 @@ from .RoomType import RoomType
 from typing import Any, Optional, Self, cast, Callable
 import random
 
+
 class Map:
     def __init__(self):
         self.__rooms: dict[tuple[int, int], tuple[RoomInstance, str]] = {}
         self.room_pool_types: dict[str, tuple[RoomPool, int]] = {}
         self.spawn_pool_types: dict[str, SpawnPool]= {}
         self.room_types: dict[str, RoomType] = {}
+        # The game's WorldScheduler, rooms made with entities in them are woken on it.
+        self.scheduler: Optional[Any] = None
 
     def addRoomPool(self, room_pool: RoomPool) -> None:
         """Add a room pool to the map's selections.
@@ -34,7 +37,6 @@ class Map:
                 if room_pool.getScore(self, (x, y)) > 0
             ]
             if len(options) == 0:
-                print("There is a wall there.")
                 return None
             room_pool = random.choice(options)[0]
             room = room_pool.generate(self)
@@ -48,6 +50,8 @@ class Map:
         room.position_x = position[0]
         room.position_y = position[1]
         self.__rooms[position] = (room, room_pool)
+        if self.scheduler is not None and room.entityCount() > 0:
+            self.scheduler.wake(position, self.scheduler.tick + 1)
         self.room_pool_types[room_pool] = (
             self.room_pool_types[room_pool][0],
             self.room_pool_types[room_pool][1] + 1
@@ -1,16 +1,62 @@
 from .RoomType import RoomType
 from .Interactable import Interactable
+from .RoomSummary import RoomSummary
 from ..entity import EntityInstance
-from typing import Any
+from typing import Any, Iterator, Optional, Sequence, cast
 
 class RoomInstance:
+    """A room in the world, entities come and go through addEntity, addEntities, removeEntity and killEntities.
+    """
+    __slots__ = ("__room_type", "tags", "__interactables", "__entities", "__factions", "position_x", "position_y", "summary")
+
     def __init__(self, room_type: RoomType):
         self.__room_type: RoomType = room_type
-        self.tags: list[str] = self.__room_type.tags
-        self.interactables: list[Interactable] = []
-        self.entities: list[EntityInstance] = []
+        self.tags: Sequence[str] = self.__room_type.tags
+        self.__interactables: dict[Interactable, None] = {}
+        self.__entities: dict[EntityInstance, None] = {}
+        # Faction id -> the room's entities of it in the order they came, made with the first entity.
+        self.__factions: Optional[dict[int, dict[EntityInstance, None]]] = None
         self.position_x: int = 0
         self.position_y: int = 0
+        # Made when the room is simulated coarsely, dropped when its entities change.
+        self.summary: Optional[RoomSummary] = None
+
+    @property
+    def entities(self) -> Sequence[EntityInstance]:
+        """Get a snapshot of the room's entities in the order they came, change them with addEntity and removeEntity.
+        """
+        return tuple(self.__entities)
+
+    @property
+    def interactables(self) -> Sequence[Interactable]:
+        """Get a snapshot of the room's interactables in the order they came, change them with addInteractable and removeInteractable.
+        """
+        return tuple(self.__interactables)
+
+    def iterEntities(self) -> Iterator[EntityInstance]:
+        """Iterate over the room's entities in the order they came without copying them, the room shouldn't change meanwhile.
+        """
+        return iter(self.__entities)
+
+    def iterInteractables(self) -> Iterator[Interactable]:
+        """Iterate over the room's interactables in the order they came without copying them, the room shouldn't change meanwhile.
+        """
+        return iter(self.__interactables)
+
+    def hasEntity(self, entity: EntityInstance) -> bool:
+        """Check if an entity is in the room.
+        """
+        return entity in self.__entities
+
+    def hasInteractable(self, interactable: Interactable) -> bool:
+        """Check if an interactable is in the room.
+        """
+        return interactable in self.__interactables
+
+    def entityCount(self) -> int:
+        """Get how many entities are in the room.
+        """
+        return len(self.__entities)
 
     def getType(self) -> RoomType:
         """Get the RoomType that this RoomInstance is.
@@ -20,55 +66,182 @@ class RoomInstance:
     def battleLoad(self) -> None:
         """Called after the battle_manager has been loaded.
         """
-        for entity in self.entities:
+        for entity in self.__entities:
             entity.battleLoad()
 
     def getDescription(self) -> str:
         """Get the description of the room for display.
         """
         to_return: str = f"{self.__room_type.name}\n{self.__room_type.description}\n"
-        if len(self.interactables) > 0:
+        if len(self.__interactables) > 0:
             to_return += (
                 " ".join(
                     [
                         interactable.getDescription()
-                        for interactable in self.interactables
+                        for interactable in self.__interactables
                     ]
                 )
                 + "\n"
             )
-        if len(self.entities) > 0:
+        if len(self.__entities) > 0:
             to_return += (
-                " ".join([entity.getDescription() for entity in self.entities]) + "\n"
+                " ".join([entity.getDescription() for entity in self.__entities]) + "\n"
             )
         return to_return
 
     def addEntity(self, entity) -> None:
         """Add an entity to the room.
         """
-        self.entities.append(entity)
+        if entity.game.entity_store is not None:
+            entity.game.entity_store.add(entity)
+        self.__entities[entity] = None
+        self.__group(entity)
+        self.summary = None
+
+    def addEntities(self, entities) -> None:
+        """Add a list of entities to the room.
+        """
+        if len(entities) > 0 and entities[0].game.entity_store is not None:
+            for entity in entities:
+                entities[0].game.entity_store.add(entity)
+        for entity in entities:
+            self.__entities[entity] = None
+            self.__group(entity)
+        self.summary = None
+
+    def __group(self, entity: EntityInstance) -> None:
+        """Put an entity in the group of its faction.
+        """
+        if self.__factions is None:
+            self.__factions = {}
+        group = self.__factions.get(entity.faction_id)
+        if group is None:
+            group = self.__factions[entity.faction_id] = {}
+        group[entity] = None
+
+    def removeEntity(self, entity: EntityInstance) -> None:
+        """Remove an entity from the room and its store.
+        """
+        del self.__entities[entity]
+        factions = cast(dict[int, dict[EntityInstance, None]], self.__factions)
+        group = factions[entity.faction_id]
+        del group[entity]
+        if len(group) == 0:
+            del factions[entity.faction_id]
+        if entity.game.entity_store is not None:
+            entity.game.entity_store.remove(entity)
+        self.summary = None
+
+    def factionGroup(self, faction_id: int) -> Sequence[EntityInstance]:
+        """Get the room's entities of a faction in the order they came.
+        """
+        if self.__factions is None or faction_id not in self.__factions:
+            return ()
+        return list(self.__factions[faction_id])
+
+    def firstHostileTo(self, entity: EntityInstance) -> Optional[EntityInstance]:
+        """Get the first other entity in the room that an entity's faction is hostile to, None if there isn't one.
+
+        Groups are looked at in the order their factions came to the room.
+        """
+        mask = entity.game.faction_table.hostility[entity.faction_id]
+        if mask == 0 or self.__factions is None:
+            return None
+        for faction_id, group in self.__factions.items():
+            if (mask >> faction_id) & 1:
+                for other in group:
+                    if other is not entity:
+                        return other
+        return None
 
     def addInteractable(self, interactable) -> None:
         """Add an interactable to the room.
         """
-        self.interactables.append(interactable)
+        self.__interactables[interactable] = None
 
     def removeInteractable(self, interactable) -> None:
         """Remove an interactable from the room.
         """
-        self.interactables.remove(interactable)
+        del self.__interactables[interactable]
 
     def update(self) -> None:
         """Update the room instance.
         """
-        to_kill: list[EntityInstance] = [participant for participant in self.entities if participant.to_die]
+        self.updateEntities(list(self.__entities))
+
+    def updateEntities(self, entities: list[EntityInstance]) -> None:
+        """Update some of the room's entities, the dead among them are removed from the room first.
+        """
+        store = entities[0].game.entity_store if len(entities) > 0 else None
+        self.killEntities(store.dead(entities) if store is not None else [participant for participant in entities if participant.to_die])
+        self.summary = None
+        for entity in entities:
+            if not entity.to_die:
+                entity.update(self)
+
+    def killEntities(self, to_kill: list[EntityInstance]) -> None:
+        """Remove a batch of dying entities from the room, they leave their battles and run their death.
+
+        Every death runs before any of them leave, so death effects see the whole batch
+        still in the room. With the game's pools the removed entities are given back.
+        """
         for dead in to_kill:
             if dead.hasData("in_battle"):
                 dead.flee()
             dead.death(self)
-            self.entities.remove(dead)
-        for entity in self.entities:
-            entity.update(self)
+        for dead in to_kill:
+            if dead in self.__entities:
+                self.removeEntity(dead)
+                pools = dead.game.pools
+                if pools is not None:
+                    pools.give(dead)
+
+    def coarseUpdate(self, game) -> None:
+        """Update the room from its summary instead of its entities, settling the fights between
+        its factions at once. Only the entities that die are touched.
+        """
+        if self.summary is None:
+            self.summary = RoomSummary.fromEntities(self.__entities)
+        deaths = self.summary.resolve(game.faction_table.hostility)
+        to_kill: list[EntityInstance] = []
+        for faction_id, count in deaths.items():
+            if count > 0:
+                members = [entity for entity in self.factionGroup(faction_id) if not entity.to_die]
+                members.sort(key=lambda entity: entity.hp)
+                to_kill.extend(members[:count])
+        for dead in to_kill:
+            dead.to_die = True
+        summary = self.summary
+        self.killEntities(to_kill)
+        # The summary already counts them out.
+        self.summary = summary
+
+    def catchUp(self, ticks: int) -> None:
+        """Count the data of the room's entities down for ticks the room slept through.
+        """
+        for entity in self.__entities:
+            entity.data.tick(ticks)
+
+    def ticksUntilChange(self, game) -> Optional[int]:
+        """Get how many ticks until something in the room can change on its own, None if nothing will.
+
+        That is when the first data of an entity expires, or the next tick if there are entities
+        with an AI not in a battle that are hostile to others in the room.
+        """
+        from ..components import AI
+        soonest: Optional[int] = None
+        idle: set[int] = set()
+        for entity in self.__entities:
+            ticks = entity.data.ticksUntilExpiry()
+            if ticks is not None and (soonest is None or ticks < soonest):
+                soonest = ticks
+            if not entity.hasData("in_battle") and entity.getComponent(AI) is not None:
+                idle.add(entity.faction_id)
+        if len(idle) > 0 and self.__factions is not None:
+            hostility = game.faction_table.hostility
+            if any((hostility[faction_id] >> other) & 1 for faction_id in idle for other in self.__factions if other != 0):
+                return 1
+        return soonest
 
     @classmethod
     def fromDict(cls, data: dict[str, Any], game):
@@ -76,15 +249,13 @@ class RoomInstance:
         """
         room_instance: RoomInstance = cls(game.map.room_types[data["type"]])
         if "interactables" in data:
-            room_instance.interactables = [
-                Interactable.fromDict(interactable)
-                for interactable in data["interactables"]
-            ]
+            for interactable in data["interactables"]:
+                room_instance.addInteractable(Interactable.fromDict(interactable))
         if "entities" in data:
-            room_instance.entities = [
+            room_instance.addEntities([
                 EntityInstance.fromDict(entity, game)
                 for entity in data["entities"]
-            ]
+            ])
         if "position_x" in data:
             room_instance.position_x = data["position_x"]
         if "position_y" in data:
@@ -97,9 +268,9 @@ class RoomInstance:
         return {
             "type": self.__room_type.id,
             "interactables": [
-                interactable.toDict() for interactable in self.interactables
+                interactable.toDict() for interactable in self.__interactables
             ],
-            "entities": [entity.toDict() for entity in self.entities],
+            "entities": [entity.toDict() for entity in self.__entities],
             "position_x": self.position_x,
             "position_y": self.position_y
         }
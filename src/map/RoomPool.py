@@ -29,7 +29,8 @@ class RoomPool:
         """Generate a roompool and return the selected room with properly applied spawn pools.
         """
         room: RoomInstance = RoomInstance(map.room_types[random.choice(self.rooms)])
-        room.tags.extend(self.tags)
+        if len(self.tags) > 0:
+            room.tags = [*room.tags, *self.tags]
 
         # This is where spawn pools will be applied.
         options = [
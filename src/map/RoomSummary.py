@@ -0,0 +1,69 @@
+from typing import Any, Iterable, Self
+import math, random
+
+
+class RoomSummary:
+    """The coarse state of a room far from the player, its entities counted up by faction.
+
+    Holds each faction's count, total hp and total expected damage per round, entities
+    without a faction aren't counted.
+    """
+    __slots__ = ("counts", "hp", "damage")
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.hp: dict[int, float] = {}
+        self.damage: dict[int, float] = {}
+
+    @classmethod
+    def fromEntities(cls, entities: Iterable[Any]) -> Self:
+        """Count up the entities of a room.
+        """
+        from ..battle import expectedDamage
+        summary = cls()
+        for entity in entities:
+            faction_id = entity.faction_id
+            if faction_id == 0 or entity.to_die:
+                continue
+            summary.counts[faction_id] = summary.counts.get(faction_id, 0) + 1
+            summary.hp[faction_id] = summary.hp.get(faction_id, 0) + entity.hp
+            summary.damage[faction_id] = summary.damage.get(faction_id, 0) + expectedDamage(entity)
+        return summary
+
+    def strength(self, faction_id: int) -> float:
+        """Get a faction's fighting strength, its total hp times its total damage.
+        """
+        return self.hp[faction_id] * self.damage[faction_id]
+
+    def contested(self, hostility: list[int]) -> list[tuple[int, int]]:
+        """Get the pairs of factions in the room where the first is hostile to the second and can hurt it.
+        """
+        return [
+            (faction_id, other) for faction_id in self.counts for other in self.counts
+            if (hostility[faction_id] >> other) & 1 and self.damage[faction_id] > 0
+        ]
+
+    def resolve(self, hostility: list[int]) -> dict[int, int]:
+        """Settle the fights in the room and return how many of each faction die.
+
+        Each hostile pair fights once. The winner is drawn in proportion to their strengths and
+        the loser is wiped out. The winner keeps the share of its numbers Lanchester's square
+        law gives, the square root of one minus the loser's strength over its own, and at
+        least one survivor.
+        """
+        deaths: dict[int, int] = {}
+        for faction_id, other in self.contested(hostility):
+            if faction_id not in self.counts or other not in self.counts:
+                continue
+            first, second = self.strength(faction_id), self.strength(other)
+            winner, loser = (faction_id, other) if random.random() * (first + second) < first else (other, faction_id)
+            kept = math.sqrt(max(0.0, 1 - self.strength(loser) / self.strength(winner))) if self.strength(winner) > 0 else 0.0
+            survivors = max(1, round(self.counts[winner] * kept))
+            deaths[loser] = deaths.get(loser, 0) + self.counts[loser]
+            deaths[winner] = deaths.get(winner, 0) + self.counts[winner] - survivors
+            self.hp[winner] *= survivors / self.counts[winner]
+            self.damage[winner] *= survivors / self.counts[winner]
+            self.counts[winner] = survivors
+            for table in (self.counts, self.hp, self.damage):
+                table.pop(loser)
+        return deaths
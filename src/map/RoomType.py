@@ -5,7 +5,7 @@ class RoomType:
         self.id: str = id
         self.name: str = name
         self.description: str = description
-        self.tags: list[str] = tags
+        self.tags: tuple[str, ...] = tuple(tags)
 
     @classmethod
     def fromDict(cls, id: str, data: dict[str, Any]) -> Self:
@@ -0,0 +1,83 @@
+import heapq
+
+# How many rooms away from the player the world keeps running.
+ACTIVE_RADIUS: int = 1
+# Rooms further than this from the player are simulated coarsely when they wake.
+DETAIL_RADIUS: int = 2
+
+
+class WorldScheduler:
+    """Picks the rooms to update each tick, the rooms within a radius of the player, rooms with
+    battles and rooms whose wake-up tick has come.
+
+    A room is given a wake-up tick when it is updated, for when the first data of its entities
+    expires or straight away if hostile entities in it could start a battle. A room that slept
+    catches its entities' data up when it is next updated. The rooms updated in a tick don't
+    depend on the size of the map.
+
+    Rooms past the detail radius without a battle are updated with coarseUpdate, from counts
+    of their factions instead of their entities' AI, and woken the same way. They are updated
+    fully again once the player comes close.
+    """
+    def __init__(self, radius: int = ACTIVE_RADIUS, detail_radius: int = DETAIL_RADIUS):
+        self.radius: int = radius
+        self.detail_radius: int = detail_radius
+        self.tick: int = 0
+        # Position -> the tick the room was last updated on.
+        self.last_updated: dict[tuple[int, int], int] = {}
+        # (tick, position) heap of wake-ups, ones replaced by an earlier wake-up are skipped.
+        self.__wake_ups: list[tuple[int, tuple[int, int]]] = []
+        self.__wake_at: dict[tuple[int, int], int] = {}
+
+    def wake(self, position: tuple[int, int], tick: int) -> None:
+        """Wake the room at a position on a tick, the earliest wake-up asked for wins.
+        """
+        if position not in self.__wake_at or tick < self.__wake_at[position]:
+            self.__wake_at[position] = tick
+            heapq.heappush(self.__wake_ups, (tick, position))
+
+    def isCoarse(self, position: tuple[int, int], game) -> bool:
+        """Check if the room at a position is far enough from the player to be simulated coarsely.
+        """
+        return max(abs(position[0] - game.player_x), abs(position[1] - game.player_y)) > self.detail_radius
+
+    def activeRooms(self, game) -> list[tuple[int, int]]:
+        """Get the positions of the rooms to update this tick, the player's room first.
+        """
+        rooms = game.map.getRooms()
+        active: dict[tuple[int, int], None] = {(game.player_x, game.player_y): None}
+        for x in range(game.player_x - self.radius, game.player_x + self.radius + 1):
+            for y in range(game.player_y - self.radius, game.player_y + self.radius + 1):
+                if (x, y) in rooms:
+                    active[(x, y)] = None
+        for position in game.battle_manager.room_battles:
+            active[position] = None
+        wake_ups = self.__wake_ups
+        while len(wake_ups) > 0 and wake_ups[0][0] <= self.tick:
+            tick, position = heapq.heappop(wake_ups)
+            if self.__wake_at.get(position) == tick:
+                self.__wake_at.pop(position)
+                if position in rooms:
+                    active[position] = None
+        return list(active)
+
+    def update(self, game) -> None:
+        """Update the active rooms and give them their next wake-up tick.
+        """
+        self.tick += 1
+        rooms = game.map.getRooms()
+        for position in self.activeRooms(game):
+            room = game.getRoom() if position == (game.player_x, game.player_y) else rooms[position][0]
+            last_updated = self.last_updated.get(position, self.tick - 1)
+            if self.isCoarse(position, game) and position not in game.battle_manager.room_battles:
+                # A coarse update doesn't count data down, so this tick is caught up too.
+                room.catchUp(self.tick - last_updated)
+                room.coarseUpdate(game)
+            else:
+                if self.tick - last_updated > 1:
+                    room.catchUp(self.tick - last_updated - 1)
+                room.update()
+            self.last_updated[position] = self.tick
+            ticks = room.ticksUntilChange(game)
+            if ticks is not None:
+                self.wake(position, self.tick + ticks)
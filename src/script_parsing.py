@@ -1,10 +1,66 @@
 # pyright: reportRedeclaration=false
 
 from .util import indexOfIndexable
-from typing import Any, Callable, cast
+from typing import Any, Callable, Optional, cast
 from .map.Interactable import Interactable
 import random
 
+# Script types whose result depends on the random state or on something other than their targets.
+RANDOM_SCRIPT_TYPES: set[str] = {"random_int", "random_uniform", "change_room", "add_entities"}
+
+
+def isDeterministic(data: Any) -> bool:
+    """Check if a script gives the same result every time it runs on the same targets.
+    """
+    if isinstance(data, dict):
+        if data.get("type") in RANDOM_SCRIPT_TYPES:
+            return False
+        return all(isDeterministic(value) for value in data.values())
+    if isinstance(data, list):
+        return all(isDeterministic(value) for value in data)
+    return True
+
+
+def scriptTargets(data: Any) -> set[int]:
+    """Get the target indexes a script reads or changes.
+    """
+    if isinstance(data, dict):
+        targets = {
+            value for key, value in data.items()
+            if key in ("target", "xp_target", "interactable", "room") and isinstance(value, int) and value != -1
+        }
+        for value in data.values():
+            targets |= scriptTargets(value)
+        return targets
+    if isinstance(data, list):
+        return set().union(*(scriptTargets(value) for value in data))
+    return set()
+
+
+def valueRange(data: Any) -> Optional[tuple[float, float, float]]:
+    """Work out the (min, expected, max) of a value script without running it.
+
+    Returns None for values that depend on their targets, such as target and get_data.
+    """
+    if isinstance(data, dict) and "type" in data:
+        data_type = data["type"]
+        if data_type in ("random_int", "random_uniform"):
+            lower = valueRange(data["lower"])
+            upper = valueRange(data["upper"])
+            if lower is None or upper is None:
+                return None
+            return (lower[0], (lower[1] + upper[1]) / 2, upper[2])
+        elif data_type == "add":
+            value_one = valueRange(data["value_one"])
+            value_two = valueRange(data["value_two"])
+            if value_one is None or value_two is None:
+                return None
+            return (value_one[0] + value_two[0], value_one[1] + value_two[1], value_one[2] + value_two[2])
+        return None
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return (data, data, data)
+    return None
+
 
 def parse(data: dict[str, Any], game) -> Callable[[list[Any]], Any]:
     """Parses a dictonary into the proper function and returns it.
@@ -88,11 +144,10 @@ def parse(data: dict[str, Any], game) -> Callable[[list[Any]], Any]:
 
         def toReturn(targets: list[Any]):
             temp = random.random() * cap
-            for weight, entity_function in entities:
+            for weight, _, entities_function in entities:
                 temp -= weight
                 if temp <= 0:
-                    for _ in range(amount(targets)):
-                        targets[target].addEntity(entity_function())
+                    targets[target].addEntities(entities_function(amount(targets)))
                     return
     elif data_type == "change_max_hp":
         target: int = data["target"]
@@ -120,10 +175,8 @@ def parse(data: dict[str, Any], game) -> Callable[[list[Any]], Any]:
         item_type = parseValue(data["item"])
         from .components import Inventory
         def toReturn(targets: list[Any]):
-            for component in targets[target].components:
-                if isinstance(component, Inventory):
-                    for _ in range(amount(targets)):
-                        component.addItem(game.item_types[item_type(targets)])
+            for component in targets[target].getComponents(Inventory):
+                component.addItems(game.item_types[item_type(targets)], amount(targets), game.pools)
     elif data_type == "remove_interactable":
         interactable = data["interactable"]
         room = data["room"]
@@ -188,8 +241,12 @@ def parseValue(data: dict[str, Any]) -> Callable[[list[Any]], Any]:
     return toReturn
 
 
-def parseEntityEntry(data: dict[str, Any], game) -> tuple[int, Callable[[], Any]]:
-    """Parses an entity from a dictionary entity and returns a function to make it.
+def parseEntityEntry(data: dict[str, Any], game) -> tuple[int, Callable[[], Any], Callable[[int], list[Any]]]:
+    """Parses an entity from a dictionary entity and returns its weight, a function to make
+    one and a function to make a list of them.
+
+    The entity is built once here and spawning clones it, unless a class level it gains has
+    random features, then every entity is built from scratch.
     """
     from .entity import EntityInstance, EntityType
     weight = data["weight"]
@@ -199,8 +256,8 @@ def parseEntityEntry(data: dict[str, Any], game) -> tuple[int, Callable[[], Any]
     
     from .components import componentFromData, Component
 
-    def createEntity():
-        entity: EntityInstance = EntityInstance(game, entity_type)
+    def buildEntity():
+        entity: EntityInstance = EntityInstance(game, entity_type) if game.pools is None else game.pools.make(EntityInstance, game, entity_type)
         if "name" in overrides:
             entity.name = overrides["name"]
         if "description" in overrides:
@@ -210,16 +267,12 @@ def parseEntityEntry(data: dict[str, Any], game) -> tuple[int, Callable[[], Any]
                 tag_type = tag["type"]
                 value = tag["value"]
                 if tag_type == "add":
-                    if value not in entity.tags:
-                        entity.tags.append(value)
+                    entity.addTag(value)
                 elif tag_type == "remove":
-                    if value in entity.tags:
-                        entity.tags.remove(value)
+                    entity.removeTag(value)
         if "components" in overrides:
-            entity.components.extend([
-                cast(Component, componentFromData(component_data, game))
-                for component_data in overrides["components"]
-            ])
+            for component_data in overrides["components"]:
+                entity.addComponent(cast(Component, componentFromData(component_data, game)))
         if "actions" in overrides:
             for action in overrides["actions"]:
                 entity.addAction(game.ability_types[action])
@@ -232,4 +285,20 @@ def parseEntityEntry(data: dict[str, Any], game) -> tuple[int, Callable[[], Any]
             entity.faction = overrides["faction"]
         return entity
 
-    return weight, createEntity
+    deterministic = all(
+        level_detail.deterministic
+        for class_data in overrides.get("classes", [])
+        for level_detail in game.class_types[class_data["class"]].level_data[:class_data["level"]]
+    )
+    if deterministic:
+        prototype: EntityInstance = buildEntity()
+
+        def createEntity():
+            return prototype.clone()
+    else:
+        createEntity = buildEntity
+
+    def createEntities(amount: int) -> list[Any]:
+        return [createEntity() for _ in range(amount)]
+
+    return weight, createEntity, createEntities
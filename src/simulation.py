@@ -0,0 +1,516 @@
+from .engine import Engine, DIRECTIONS
+from .entity import EntityInstance
+from .map.RoomInstance import RoomInstance
+from .battle import BattleManager
+from .script_parsing import parseEntityEntry
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from collections import Counter
+from typing import Any, Callable, Optional, TextIO
+import argparse, json, os, random, statistics, sys, time
+
+# Fights and runs are sent to workers in batches so pickling is paid per batch, not per fight.
+FIGHT_BATCH_SIZE: int = 64
+RUN_BATCH_SIZE: int = 8
+# Rollouts per Monte Carlo tree search in simulations, about what 10 milliseconds allows.
+SEARCH_ITERATIONS: int = 50
+
+
+class SimulationEngine(Engine):
+    """An Engine that throws events away, nothing is watching a simulation.
+
+    Monte Carlo tree searches run SEARCH_ITERATIONS rollouts unless a personality gives its
+    own iterations, so seeded simulations pick the same moves however busy the machine is.
+    """
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.search_iterations = SEARCH_ITERATIONS
+
+    def emit(self, event_type: str, message: str = "", **details: Any) -> None:
+        """Discard the event.
+        """
+        pass
+
+
+worker_engine: Optional[SimulationEngine] = None
+
+
+def initWorker(mods_path: str, active_mods: Optional[list[str]], pooling: bool = False) -> None:
+    """Load the mods once per worker process.
+
+    The engine runs battles turn by turn, so fights are counted the same wherever their room is.
+    """
+    global worker_engine
+    worker_engine = SimulationEngine(mods_path, active_mods=active_mods, auto_resolve="turns", pooling=pooling)
+
+
+def workerEngine() -> SimulationEngine:
+    """Get the engine of this worker process.
+    """
+    return worker_engine # pyright: ignore
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    """Summarize a distribution of values.
+    """
+    if len(values) == 0:
+        return {}
+    ordered = sorted(values)
+    return {
+        "mean": statistics.fmean(ordered),
+        "stdev": statistics.pstdev(ordered),
+        "min": ordered[0],
+        "p10": ordered[int(0.1 * (len(ordered) - 1))],
+        "median": statistics.median(ordered),
+        "p90": ordered[int(0.9 * (len(ordered) - 1))],
+        "max": ordered[-1],
+    }
+
+
+def runFight(engine: Engine, sides: list[list[tuple]], room_type: str, seed: int, max_turns: int) -> tuple:
+    """Run one battle to completion and return (winner, turns, first_kill_turn, opponent_hp_lost, deaths).
+
+    The sides hold entity entries already parsed with parseEntityEntry. The engine's auto_resolve
+    should be "turns", otherwise the battle is resolved in one tick when the player can't see it.
+
+    opponent_hp_lost is the hp every other side lost, not who dealt it. With three or more
+    sides, damage two opponents deal each other counts for the side too.
+
+    The winner is the index of the last side standing, -1 when everyone fled or died
+    and -2 when the fight hit max_turns.
+    """
+    random.seed(seed)
+    if engine.pools is not None:
+        engine.pools.settle()
+    engine.battle_manager = BattleManager()
+    room = RoomInstance(engine.map.room_types[room_type])
+    fighters: list[list[EntityInstance]] = []
+    for side in sides:
+        fighters.append([])
+        for entry in side:
+            entity = entry[1]()
+            fighters[-1].append(entity)
+            room.addEntity(entity)
+    starting_hp = [[entity.hp for entity in side] for side in fighters]
+
+    battle_id = engine.battle_manager.startBattle(room)
+    for side in fighters:
+        for entity in side:
+            engine.battle_manager.joinBattle(entity, battle_id)
+
+    turns = 0
+    first_kill = -1
+    winner = -2
+    while turns < max_turns:
+        turns += 1
+        room.update()
+        engine.battle_manager.updateBattles(engine)
+        standing = [
+            i for i, side in enumerate(fighters)
+            if any(not entity.to_die and room.hasEntity(entity) for entity in side)
+        ]
+        if first_kill == -1 and any(entity.to_die for side in fighters for entity in side):
+            first_kill = turns
+        if len(standing) <= 1:
+            winner = standing[0] if len(standing) == 1 else -1
+            break
+        if len(engine.battle_manager.battles) == 0:
+            winner = -1
+            break
+
+    opponent_hp_lost = []
+    deaths = []
+    for i, side in enumerate(fighters):
+        opponent_hp_lost.append(sum(
+            max(starting_hp[j][k] - entity.hp, 0)
+            for j, other_side in enumerate(fighters) if j != i
+            for k, entity in enumerate(other_side)
+        ))
+        deaths.append(sum(1 for entity in side if entity.to_die))
+    return winner, turns, first_kill, opponent_hp_lost, deaths
+
+
+def runFightBatch(sides: list[list[dict[str, Any]]], room_type: str, seeds: list[int], max_turns: int) -> list[tuple]:
+    """Run a batch of fights in a worker process.
+    """
+    engine = workerEngine()
+    entries = [[parseEntityEntry(entry, engine) for entry in side] for side in sides]
+    return [runFight(engine, entries, room_type, seed, max_turns) for seed in seeds]
+
+
+def simulateBattles(sides: list[list[dict[str, Any]]], fights: int = 1000, seed: int = 0, room_type: Optional[str] = None, max_turns: int = 200, workers: Optional[int] = None, mods_path: str = "mods", active_mods: Optional[list[str]] = None, pooling: bool = False) -> dict[str, Any]:
+    """Run many seeded battles between sides of spawn pool style entity entries and report the outcomes.
+
+    Every fight i is seeded with seed + i, so results do not depend on the number of workers.
+    With pooling the fighters of one fight are reused by the next.
+    """
+    workers = workers or os.cpu_count() or 1
+    if room_type is None:
+        room_type = next(iter(Engine(mods_path, active_mods=active_mods).map.room_types))
+    seeds = list(range(seed, seed + fights))
+    batches = [seeds[i:i + FIGHT_BATCH_SIZE] for i in range(0, len(seeds), FIGHT_BATCH_SIZE)]
+
+    start = time.perf_counter()
+    results: list[tuple] = []
+    if workers <= 1:
+        initWorker(mods_path, active_mods, pooling)
+        for batch in batches:
+            results.extend(runFightBatch(sides, room_type, batch, max_turns))
+    else:
+        with ProcessPoolExecutor(workers, initializer=initWorker, initargs=(mods_path, active_mods, pooling)) as executor:
+            for batch_results in executor.map(runFightBatch, *zip(*[(sides, room_type, batch, max_turns) for batch in batches])):
+                results.extend(batch_results)
+    seconds = time.perf_counter() - start
+
+    return {
+        "fights": fights,
+        "seconds": seconds,
+        "fights_per_second": fights / seconds if seconds > 0 else 0.0,
+        "draws": sum(1 for result in results if result[0] == -1),
+        "timeouts": sum(1 for result in results if result[0] == -2),
+        "turns": summarize([result[1] for result in results]),
+        "turns_to_first_kill": summarize([result[2] for result in results if result[2] != -1]),
+        "sides": [
+            {
+                "wins": sum(1 for result in results if result[0] == i),
+                "win_rate": sum(1 for result in results if result[0] == i) / fights if fights > 0 else 0.0,
+                "opponent_hp_lost": summarize([result[3][i] for result in results]),
+                "deaths": summarize([result[4][i] for result in results]),
+            }
+            for i in range(len(sides))
+        ],
+    }
+
+
+class ExplorerPolicy:
+    """Explores unexplored rooms first, uses every interactable once and fights the weakest hostile.
+
+    Config keys: "heal_below" and "flee_below" as fractions of max hp.
+    """
+    def __init__(self, config: dict[str, Any]):
+        self.heal_below: float = config.get("heal_below", 0.4)
+        self.flee_below: float = config.get("flee_below", 0.0)
+        self.tried: set[tuple] = set()
+        self.walls: set[tuple[int, int]] = set()
+
+    def reset(self) -> None:
+        """Forget everything from the previous run.
+        """
+        self.tried = set()
+        self.walls = set()
+
+    def chooseCommand(self, engine: Engine) -> dict[str, Any]:
+        """Pick the next command while the player is out of battle.
+        """
+        player = engine.player
+        for class_type in engine.class_types.values():
+            if player.levelInClass(class_type) >= 0 and 0 <= player.nextXPInClass(class_type) <= player.xp:
+                return {"type": "level", "class": class_type.id}
+        position = (engine.player_x, engine.player_y)
+        for interactable in engine.getRoom().iterInteractables():
+            for choice in range(len(interactable.uses)):
+                key = (position, interactable.serial, choice)
+                if key not in self.tried:
+                    self.tried.add(key)
+                    return {"type": "interact", "name": interactable.name, "choice": choice}
+        options = [
+            direction for direction, offset in DIRECTIONS.items()
+            if (position[0] + offset[0], position[1] + offset[1]) not in self.walls
+        ]
+        unexplored = [
+            direction for direction in options
+            if (position[0] + DIRECTIONS[direction][0], position[1] + DIRECTIONS[direction][1]) not in engine.map.getRooms()
+        ]
+        return {"type": "move", "direction": random.choice(unexplored or options or list(DIRECTIONS))}
+
+    def chooseTurns(self, engine: Engine) -> list[dict[str, Any]]:
+        """List turns to try in order of preference while the player is in battle.
+        """
+        player = engine.player
+        participants = engine.getBattleParticipants()
+        turns: list[dict[str, Any]] = []
+        inventory = engine.getInventory()
+        if player.hp < self.heal_below * player.max_hp and inventory != None:
+            for slot, item in enumerate(inventory.items):
+                if item != None:
+                    for use, ability in enumerate(item.getType().uses):
+                        if "creature" not in engine.ability_types[ability].targets:
+                            turns.append({"type": "use", "slot": slot, "use": use})
+        if player.hp < self.flee_below * player.max_hp:
+            turns.append({"type": "flee"})
+        store = engine.entity_store
+        standing = [participant for participant in participants if not participant.to_die]
+        hostile_to_player = store.hostileTo(player.faction_id, standing) if store is not None else engine.faction_table.hostileTo(player.faction_id, standing)
+        index = {participant: i for i, participant in enumerate(participants)}
+        hostile = sorted((index[participant] for participant in hostile_to_player), key=lambda i: participants[i].hp)
+        for target in hostile:
+            if inventory != None:
+                for slot, item in enumerate(inventory.items):
+                    if item != None:
+                        for use, ability in enumerate(item.getType().uses):
+                            if "creature" in engine.ability_types[ability].targets:
+                                turns.append({"type": "use", "slot": slot, "use": use, "target": target})
+            for action_index, action in enumerate(player.actions):
+                if action.getType().category == "other_damage":
+                    turns.append({"type": "act", "action": action_index, "target": target})
+        return turns
+
+    def noteMove(self, engine: Engine, command: dict[str, Any], previous: tuple[int, int]) -> None:
+        """Remember walls so the policy stops walking into them.
+        """
+        offset = DIRECTIONS[command["direction"]]
+        if previous == (engine.player_x, engine.player_y):
+            self.walls.add((previous[0] + offset[0], previous[1] + offset[1]))
+
+
+class RandomPolicy(ExplorerPolicy):
+    """Wanders in random directions and attacks random hostiles.
+    """
+    def chooseCommand(self, engine: Engine) -> dict[str, Any]:
+        """Pick a random direction.
+        """
+        return {"type": "move", "direction": random.choice(list(DIRECTIONS))}
+
+    def chooseTurns(self, engine: Engine) -> list[dict[str, Any]]:
+        """Shuffle the explorer's options.
+        """
+        turns = super().chooseTurns(engine)
+        random.shuffle(turns)
+        return turns
+
+
+POLICIES: dict[str, Callable[[dict[str, Any]], ExplorerPolicy]] = {
+    "explorer": ExplorerPolicy,
+    "random": RandomPolicy,
+}
+
+
+class BotEngine(SimulationEngine):
+    """An Engine whose player is driven by a policy.
+    """
+    def __init__(self, mods_path: str, active_mods: Optional[list[str]], policy: ExplorerPolicy, pooling: bool = False):
+        self.policy: ExplorerPolicy = policy
+        self.xp_spent: int = 0
+        super().__init__(mods_path, active_mods=active_mods, pooling=pooling)
+
+    def choosePlayerTurn(self) -> Optional[Callable[[], None]]:
+        """Take the first turn the policy offers that is valid.
+        """
+        def turn() -> None:
+            for command in self.policy.chooseTurns(self):
+                match command["type"]:
+                    case "act":
+                        result = self.applyAction(command["action"], command["target"])
+                    case "use":
+                        result = self.applyItemUse(command["slot"], command["use"], command.get("target"))
+                    case _:
+                        self.player.flee()
+                        return
+                if result["ok"]:
+                    return
+
+        return turn
+
+    def levelUp(self, class_id: str) -> dict[str, Any]:
+        """Level up, keeping count of the xp spent for the xp curve.
+        """
+        xp = self.player.xp
+        result = super().levelUp(class_id)
+        self.xp_spent += xp - self.player.xp
+        return result
+
+    def runOnce(self, seed: int, config: dict[str, Any]) -> dict[str, Any]:
+        """Play one seeded run until the player dies or runs out of steps.
+        """
+        random.seed(seed)
+        self.policy.reset()
+        self.xp_spent = 0
+        self.startGame(config.get("name", "Bot"), config.get("class", next(iter(self.class_types))))
+        max_steps: int = config.get("max_steps", 500)
+        sample_every: int = config.get("sample_every", 25)
+        xp_curve: list[int] = []
+        max_depth = 0
+        steps = 0
+        while steps < max_steps and not self.player.to_die:
+            if steps % sample_every == 0:
+                xp_curve.append(self.player.xp + self.xp_spent)
+            steps += 1
+            if self.player.hasData("in_battle"):
+                self.wait()
+                continue
+            command = self.policy.chooseCommand(self)
+            previous = (self.player_x, self.player_y)
+            self.execute(command)
+            if command["type"] == "move":
+                self.policy.noteMove(self, command, previous)
+            max_depth = max(max_depth, abs(self.player_x) + abs(self.player_y))
+        return {
+            "seed": seed,
+            "steps": steps,
+            "died": self.player.to_die,
+            "death_depth": abs(self.player_x) + abs(self.player_y) if self.player.to_die else None,
+            "max_depth": max_depth,
+            "rooms": len(self.map.getRooms()),
+            "room_pools": dict(Counter(room_pool for _, room_pool in self.map.getRooms().values())),
+            "xp": self.player.xp + self.xp_spent,
+            "xp_curve": xp_curve,
+        }
+
+
+bot_engine: Optional[BotEngine] = None
+
+
+def initBotWorker(mods_path: str, active_mods: Optional[list[str]], config: dict[str, Any]) -> None:
+    """Load the mods and the policy once per worker process.
+    """
+    global bot_engine
+    policy = config.get("policy", {"type": "explorer"})
+    bot_engine = BotEngine(mods_path, active_mods, POLICIES[policy["type"]](policy), config.get("pooling", False))
+
+
+def runRunBatch(seeds: list[int], config: dict[str, Any]) -> list[dict[str, Any]]:
+    """Play a batch of runs in a worker process.
+    """
+    return [bot_engine.runOnce(seed, config) for seed in seeds] # pyright: ignore
+
+
+class RunStatistics:
+    """Aggregates run records as they stream past without keeping them.
+    """
+    def __init__(self):
+        self.runs: int = 0
+        self.deaths: int = 0
+        self.steps: int = 0
+        self.rooms: int = 0
+        self.death_depths: Counter = Counter()
+        self.room_pools: Counter = Counter()
+        self.xp_sums: list[int] = []
+        self.xp_counts: list[int] = []
+
+    def add(self, record: dict[str, Any]) -> None:
+        """Fold a run record into the totals.
+        """
+        self.runs += 1
+        self.steps += record["steps"]
+        self.rooms += record["rooms"]
+        if record["died"]:
+            self.deaths += 1
+            self.death_depths[record["death_depth"]] += 1
+        self.room_pools.update(record["room_pools"])
+        for i, xp in enumerate(record["xp_curve"]):
+            if i == len(self.xp_sums):
+                self.xp_sums.append(0)
+                self.xp_counts.append(0)
+            self.xp_sums[i] += xp
+            self.xp_counts[i] += 1
+
+    def toDict(self, seconds: float) -> dict[str, Any]:
+        """Summarize the runs seen so far.
+        """
+        total_rooms = sum(self.room_pools.values())
+        return {
+            "runs": self.runs,
+            "seconds": seconds,
+            "runs_per_second": self.runs / seconds if seconds > 0 else 0.0,
+            "death_rate": self.deaths / self.runs if self.runs > 0 else 0.0,
+            "mean_steps": self.steps / self.runs if self.runs > 0 else 0.0,
+            "mean_rooms": self.rooms / self.runs if self.runs > 0 else 0.0,
+            "death_depths": dict(sorted(self.death_depths.items())),
+            "room_distribution": {key: value / total_rooms for key, value in self.room_pools.most_common()} if total_rooms > 0 else {},
+            "mean_xp_curve": [xp_sum / count for xp_sum, count in zip(self.xp_sums, self.xp_counts)],
+        }
+
+
+def simulateRuns(config: dict[str, Any], output: TextIO, runs: int = 100, seed: int = 0, workers: Optional[int] = None, mods_path: str = "mods", progress: Optional[TextIO] = None) -> dict[str, Any]:
+    """Play many seeded bot runs, writing one NDJSON record per run to output.
+
+    Only a bounded number of batches are in flight at once, records are written as
+    they finish and folded into a RunStatistics, so memory does not grow with runs.
+    """
+    workers = workers or os.cpu_count() or 1
+    active_mods = config.get("mods")
+    statistics_so_far = RunStatistics()
+    start = time.perf_counter()
+
+    def write(records: list[dict[str, Any]]) -> None:
+        for record in records:
+            output.write(json.dumps(record) + "\n")
+            statistics_so_far.add(record)
+        if progress != None:
+            elapsed = time.perf_counter() - start
+            progress.write(f"\r{statistics_so_far.runs}/{runs} runs, {statistics_so_far.runs / elapsed if elapsed > 0 else 0.0:.1f} runs/sec")
+
+    batches = (
+        list(range(batch_start, min(batch_start + RUN_BATCH_SIZE, seed + runs)))
+        for batch_start in range(seed, seed + runs, RUN_BATCH_SIZE)
+    )
+    if workers <= 1:
+        initBotWorker(mods_path, active_mods, config)
+        for batch in batches:
+            write(runRunBatch(batch, config))
+    else:
+        with ProcessPoolExecutor(workers, initializer=initBotWorker, initargs=(mods_path, active_mods, config)) as executor:
+            in_flight: set[Future] = set()
+            for batch in batches:
+                in_flight.add(executor.submit(runRunBatch, batch, config))
+                if len(in_flight) >= workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(future.result())
+            for future in in_flight:
+                write(future.result())
+    if progress != None:
+        progress.write("\n")
+    return statistics_so_far.toDict(time.perf_counter() - start)
+
+
+def main() -> None:
+    """Command line entry.
+
+    python -m src.simulation battle <spec.json> holds "sides", a list of lists of spawn
+    pool style entity entries, and optionally "room", "mods", "max_turns" and "pooling".
+
+    python -m src.simulation runs <config.json> holds optionally "policy", "class",
+    "max_steps", "sample_every", "mods" and "pooling".
+    """
+    parser = argparse.ArgumentParser(description="Simulate fights and runs headlessly.")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+    battle_parser = subparsers.add_parser("battle", help="Monte Carlo battles between sides.")
+    battle_parser.add_argument("spec")
+    battle_parser.add_argument("--fights", type=int, default=1000)
+    battle_parser.add_argument("--seed", type=int, default=0)
+    battle_parser.add_argument("--workers", type=int, default=None)
+    runs_parser = subparsers.add_parser("runs", help="Whole dungeon runs played by a bot, written as NDJSON.")
+    runs_parser.add_argument("config")
+    runs_parser.add_argument("--runs", type=int, default=100)
+    runs_parser.add_argument("--seed", type=int, default=0)
+    runs_parser.add_argument("--workers", type=int, default=None)
+    runs_parser.add_argument("--output", default="-")
+    arguments = parser.parse_args()
+
+    if arguments.mode == "battle":
+        with open(arguments.spec, "r") as f:
+            spec = json.load(f)
+        report = simulateBattles(
+            spec["sides"],
+            arguments.fights,
+            arguments.seed,
+            spec.get("room"),
+            spec.get("max_turns", 200),
+            arguments.workers,
+            active_mods=spec.get("mods"),
+            pooling=spec.get("pooling", False),
+        )
+        print(json.dumps(report, indent=2))
+    elif arguments.mode == "runs":
+        with open(arguments.config, "r") as f:
+            config = json.load(f)
+        if arguments.output == "-":
+            report = simulateRuns(config, sys.stdout, arguments.runs, arguments.seed, arguments.workers, progress=sys.stderr)
+        else:
+            with open(arguments.output, "w") as output:
+                report = simulateRuns(config, output, arguments.runs, arguments.seed, arguments.workers, progress=sys.stderr)
+        print(json.dumps(report, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import Any, Self, Callable
+from typing import Any, Self, Callable, Sequence
 
 def floatput(prompt: str) -> float:
     """Get a float as input
@@ -53,7 +53,7 @@ class Restrictions:
         self.allowed:  list[str] = allowed
         self.excluded: list[str] = excluded
     
-    def score(self, tags: list[str]) -> int:
+    def score(self, tags: Sequence[str]) -> int:
         """Scores a set of tags validity for the set of restrictions.
         """
         requirements: set[str] = set(self.required)
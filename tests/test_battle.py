@@ -0,0 +1,140 @@
+from src.battle import BattleInstance, BattleManager
+from src.engine import Engine
+from src.entity import EntityInstance
+from src.map.RoomInstance import RoomInstance
+from pathlib import Path
+import random, pytest
+
+MODS_PATH = str(Path(__file__).resolve().parent.parent / "mods")
+FACTIONS = ["", "player", "monsters", "deathless"]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return Engine(MODS_PATH)
+
+
+def makeEntity(engine: Engine, rng: random.Random, name: str) -> EntityInstance:
+    """Make a slime with a random faction and speed.
+    """
+    entity = EntityInstance(engine, engine.entity_types["slime"])
+    entity.name = name
+    entity.faction = rng.choice(FACTIONS)
+    entity.speed = rng.randrange(4)
+    return entity
+
+
+def test_randomJoinsAndLeavesMatchScans(engine):
+    rng = random.Random(0)
+    hostility = engine.faction_table.hostility
+    for _ in range(100):
+        room = RoomInstance(next(iter(engine.map.room_types.values())))
+        entities = [makeEntity(engine, rng, str(i)) for i in range(12)]
+        battle = BattleInstance("0", room)
+        # Who is in the battle in the order they last joined.
+        joined: list[EntityInstance] = []
+        for _ in range(80):
+            entity = rng.choice(entities)
+            roll = rng.random()
+            if roll < 0.5:
+                battle.addParticipant(entity)
+                if entity not in joined:
+                    joined.append(entity)
+            elif roll < 0.8:
+                battle.removeParticipant(entity)
+                if entity in joined:
+                    joined.remove(entity)
+            elif roll < 0.9:
+                entity.to_die = not entity.to_die
+            else:
+                battle.runUpdate()
+            assert battle.participants == joined
+            assert battle.turn_order == sorted(joined, key=lambda participant: -participant.speed)
+            assert battle.members == set(joined)
+            assert battle.isOver() == (len(joined) == 0)
+            for participant in joined:
+                assert battle.hasParticipant(participant)
+                assert battle.opponentsOf(participant) == [
+                    other for other in joined
+                    if (hostility[participant.faction_id] >> other.faction_id) & 1 and not other.to_die
+                ]
+            assert {faction_id: list(group) for faction_id, group in battle.factions.items()} == {
+                faction_id: [participant for participant in joined if participant.faction_id == faction_id]
+                for faction_id in {participant.faction_id for participant in joined}
+            }
+
+
+def test_turnOrderFollowsSpeedChanges(engine, monkeypatch):
+    rng = random.Random(1)
+    room = RoomInstance(next(iter(engine.map.room_types.values())))
+    entities = [makeEntity(engine, rng, str(i)) for i in range(6)]
+    for entity, speed in zip(entities, [3, 5, 3, 9, 5, 1]):
+        entity.speed = speed
+    battle = BattleInstance("0", room)
+    for entity in entities:
+        battle.addParticipant(entity)
+    turns: list[str] = []
+    monkeypatch.setattr(EntityInstance, "battleUpdate", lambda self, battle, participants: turns.append(self.name))
+    battle.runUpdate()
+    assert turns == ["3", "1", "4", "0", "2", "5"]
+    turns.clear()
+    entities[3].speed = 3
+    entities[5].speed = 5
+    battle.runUpdate()
+    assert turns == ["1", "4", "5", "0", "2", "3"]
+
+
+def test_managerIndexesMatchScans(engine):
+    rng = random.Random(2)
+    manager = BattleManager()
+    rooms = []
+    for x in range(3):
+        room = RoomInstance(next(iter(engine.map.room_types.values())))
+        room.position_x = x
+        rooms.append(room)
+    entities = [makeEntity(engine, rng, str(i)) for i in range(10)]
+    ids: set[str] = set()
+    for _ in range(300):
+        roll = rng.random()
+        if roll < 0.2 or len(manager.battles) == 0:
+            id = manager.startBattle(rng.choice(rooms))
+            assert id not in ids
+            ids.add(id)
+        elif roll < 0.6:
+            # The engine only joins entities that aren't in a battle already.
+            entity = rng.choice(entities)
+            if manager.battleOf(entity) is None:
+                manager.joinBattle(entity, rng.choice(list(manager.battles)))
+        elif roll < 0.9:
+            entity = rng.choice(entities)
+            battle = manager.battleOf(entity)
+            if battle is not None:
+                manager.leaveBattle(entity, battle.id)
+        else:
+            manager.endBattle(rng.choice(list(manager.battles)))
+        for entity in entities:
+            in_battle = [battle for battle in manager.battles.values() if battle.hasParticipant(entity)]
+            assert manager.battleOf(entity) is (in_battle[0] if len(in_battle) > 0 else None)
+            assert entity.hasData("in_battle") == (len(in_battle) > 0)
+        for room in rooms:
+            position = (room.position_x, room.position_y)
+            assert manager.battlesIn(position) == [battle for battle in manager.battles.values() if battle.position == position]
+
+
+def test_loadDropsBattlesWhoseRoomIsMissing(tmp_path):
+    rng = random.Random(3)
+    engine = Engine(MODS_PATH, str(tmp_path))
+    assert engine.execute({"type": "start", "name": "Tester", "class": "adventurer"})["ok"]
+    room = engine.map.getRoom(0, 0)
+    entity = makeEntity(engine, rng, "stuck")
+    entity.faction = "monsters"
+    room.addEntity(entity)
+    id = engine.battle_manager.startBattle(room)
+    engine.battle_manager.joinBattle(entity, id)
+    data = engine.saveToDict()
+    for battle in data["battle_manager"]["battles"].values():
+        battle["room_x"] += 100
+    engine.loadFromDict(data)
+    assert len(engine.battle_manager.battles) == 0
+    loaded = [other for other in engine.map.getRoom(0, 0).entities if other.name == "stuck"]
+    assert len(loaded) == 1 and not loaded[0].hasData("in_battle")
@@ -0,0 +1,79 @@
+from src.decay import DecayingData
+from typing import Any
+import random
+
+
+class PlainData:
+    """Entity data the way it was kept before DecayingData, a dictionary of key -> (value, decay left).
+    """
+    def __init__(self):
+        self.data: dict[str, tuple[Any, int]] = {}
+
+    def set(self, key: str, value: Any, decay: int) -> None:
+        self.data[key] = (value, decay)
+
+    def tick(self, ticks: int = 1) -> None:
+        for _ in range(ticks):
+            for key in list(self.data.keys()):
+                value = self.data.pop(key)
+                if value[1] == 0:
+                    pass
+                elif value[1] == -1:
+                    self.data[key] = value
+                else:
+                    self.data[key] = (value[0], value[1] - 1)
+
+
+def checkSame(data: DecayingData, plain: PlainData) -> None:
+    """Check the data holds the same entries in the same order as the plain dictionary.
+    """
+    assert data.items() == list(plain.data.items())
+    assert len(data) == len(plain.data)
+    for key, (value, _) in plain.data.items():
+        assert key in data
+        assert data.value(key) == value
+    decays = [decay for _, decay in plain.data.values() if decay != -1]
+    if len(decays) > 0:
+        ticks = data.ticksUntilExpiry()
+        assert ticks is not None and ticks <= min(decays) + 1
+
+
+def test_randomOperationsMatchPlainData():
+    rng = random.Random(0)
+    keys = [f"key{i}" for i in range(8)]
+    for _ in range(200):
+        data = DecayingData()
+        plain = PlainData()
+        for step in range(100):
+            roll = rng.random()
+            if roll < 0.4:
+                key = rng.choice(keys)
+                decay = rng.choice([-1, 0, 1, 2, 5, rng.randrange(20)])
+                data.set(key, step, decay)
+                plain.set(key, step, decay)
+            elif roll < 0.5 and len(plain.data) > 0:
+                key = rng.choice(list(plain.data))
+                assert data.pop(key) == plain.data.pop(key)
+            elif roll < 0.55:
+                data = data.copy()
+            else:
+                ticks = rng.choice([1, 1, 1, 2, 7])
+                data.tick(ticks)
+                plain.tick(ticks)
+            checkSame(data, plain)
+
+
+def test_copyCountsDownOnItsOwn():
+    data = DecayingData({"a": (1, 2), "b": (2, -1)})
+    copy = data.copy()
+    copy.tick(3)
+    assert data.toDict() == {"a": (1, 2), "b": (2, -1)}
+    assert copy.toDict() == {"b": (2, -1)}
+
+
+def test_saveRoundTrip():
+    data = DecayingData()
+    data.set("a", 1, 4)
+    data.set("b", "x", -1)
+    data.tick(2)
+    assert DecayingData(data.toDict()).toDict() == data.toDict() == {"a": (1, 2), "b": ("x", -1)}
@@ -0,0 +1,83 @@
+from src.engine import Engine
+from pathlib import Path
+from typing import Any
+import json, random
+
+MODS_PATH = str(Path(__file__).resolve().parent.parent / "mods")
+DIRECTIONS = ["north", "east", "south", "west"]
+
+
+def playUntilBattle(engine: Engine) -> list[dict[str, Any]]:
+    """Start a game, open the starting chest and walk around until a battle starts.
+    """
+    results = [
+        engine.execute({"type": "start", "name": "Tester", "class": "adventurer"}),
+        engine.execute({"type": "interact", "name": "Chest", "choice": 0}),
+    ]
+    for i in range(200):
+        if engine.getState()["player"]["in_battle"]:
+            break
+        results.append(engine.execute({"type": "move", "direction": DIRECTIONS[i % 4] if i % 3 else "north"}))
+    return results
+
+
+def attackCommand(engine: Engine) -> dict[str, Any]:
+    """An attack on the first opponent in the player's battle with the player's damaging action.
+    """
+    action = next(i for i, action in enumerate(engine.player.actions) if action.getType().category == "other_damage")
+    target = next(i for i, participant in enumerate(engine.getState()["battle"]) if participant["faction"] != "player")
+    return {"type": "attack", "action": action, "target": target}
+
+
+def playOn(engine: Engine, seed: int) -> list[dict[str, Any]]:
+    """Fight and walk on from wherever the engine is, the same way for the same seed.
+    """
+    random.seed(seed)
+    results = []
+    for i in range(40):
+        state = engine.getState()
+        if state["player"]["dead"]:
+            break
+        if state["player"]["in_battle"]:
+            results.append(engine.execute(attackCommand(engine)))
+        else:
+            results.append(engine.execute({"type": "move", "direction": DIRECTIONS[i % 4]}))
+        results.append(engine.execute({"type": "state"}))
+    return results
+
+
+def test_saveAndLoadRoundTrip(tmp_path):
+    random.seed(5)
+    engine = Engine(MODS_PATH, str(tmp_path))
+    results = playUntilBattle(engine)
+    assert all(result["ok"] for result in results[:2])
+    state = engine.getState()
+    assert state["player"]["in_battle"]
+    attack = engine.execute(attackCommand(engine))
+    assert attack["ok"], attack["message"]
+    assert engine.execute({"type": "save", "name": "round_trip"})["ok"]
+
+    loaded = Engine(MODS_PATH, str(tmp_path))
+    result = loaded.execute({"type": "load", "name": "round_trip"})
+    assert result["ok"], result["message"]
+    assert json.dumps(loaded.saveToDict()) == json.dumps(engine.saveToDict())
+    assert loaded.getState() == engine.getState()
+    assert playOn(loaded, 6) == playOn(engine, 6)
+
+
+def test_failingCommandsReturnNotOk(tmp_path):
+    engine = Engine(MODS_PATH, str(tmp_path))
+    assert not engine.execute({"name": "Tester"})["ok"]
+    assert not engine.execute({"type": "start", "name": "Tester"})["ok"]
+    assert not engine.execute({"type": "start", "name": "Tester", "class": "nobody"})["ok"]
+    assert not engine.execute({"type": "load", "name": "missing"})["ok"]
+    assert not engine.execute({"type": "save", "name": "../escape"})["ok"]
+    (tmp_path / "unreadable.json").write_text("{")
+    assert not engine.execute({"type": "load", "name": "unreadable"})["ok"]
+    (tmp_path / "corrupt.json").write_text(json.dumps({"player": {}}))
+    assert not engine.execute({"type": "load", "name": "corrupt"})["ok"]
+
+    assert engine.execute({"type": "start", "name": "Tester", "class": "adventurer"})["ok"]
+    assert not engine.execute({"type": "move", "direction": "up"})["ok"]
+    assert not engine.execute({"type": "attack", "action": 0})["ok"]
+    assert not engine.execute({"type": "interact", "name": "Nothing"})["ok"]
@@ -0,0 +1,97 @@
+from src.components import Inventory
+from src.item import ItemInstance, ItemType
+from src.pool import ObjectPools
+from types import SimpleNamespace
+from typing import Optional
+import random
+
+ITEM_TYPES = [ItemType(f"item{i}", f"Item {i}", "", [], stack, []) for i, stack in enumerate([1, 3, 5, 20])]
+
+
+class PlainInventory:
+    """An inventory the way it was kept before the slot heaps, slots of [item type, stack] scanned in order.
+    """
+    def __init__(self, size: int):
+        self.items: list[Optional[list]] = [None for _ in range(size)]
+
+    def addItem(self, item_type: ItemType) -> bool:
+        for i, item in enumerate(self.items):
+            if item is not None and item[0] is item_type and item[1] < item_type.stack:
+                item[1] += 1
+                return True
+            elif item is None:
+                self.items[i] = [item_type, 1]
+                return True
+        return False
+
+    def changeStack(self, slot: int, amount: int) -> None:
+        item = self.items[slot]
+        item[1] = min(max(item[1] + amount, 0), item[0].stack)
+        if item[1] == 0:
+            self.items[slot] = None
+
+
+def checkSame(inventory: Inventory, plain: PlainInventory) -> None:
+    """Check the inventory holds the same stacks in the same slots, pointing back at their slots.
+    """
+    assert [None if item is None else [item.getType(), item.stack] for item in inventory.items] == plain.items
+    for slot, item in enumerate(inventory.items):
+        if item is not None:
+            assert item.inventory is inventory and item.slot == slot
+
+
+def test_randomOperationsMatchPlainInventory():
+    rng = random.Random(0)
+    for run in range(200):
+        size = rng.randrange(1, 12)
+        inventory = Inventory(size)
+        plain = PlainInventory(size)
+        pools = ObjectPools() if run % 2 == 0 else None
+        for _ in range(60):
+            roll = rng.random()
+            filled = [slot for slot, item in enumerate(plain.items) if item is not None]
+            if roll < 0.5:
+                item_type = rng.choice(ITEM_TYPES)
+                amount = rng.randrange(1, 30)
+                expected = sum(1 for _ in range(amount) if plain.addItem(item_type))
+                assert inventory.addItems(item_type, amount, pools) == expected
+            elif roll < 0.6:
+                item_type = rng.choice(ITEM_TYPES)
+                assert inventory.addItem(item_type) == plain.addItem(item_type)
+            elif roll < 0.85 and len(filled) > 0:
+                slot = rng.choice(filled)
+                amount = rng.randrange(-6, 4)
+                item = inventory.items[slot]
+                assert item is not None
+                item.changeStack(amount)
+                plain.changeStack(slot, amount)
+            elif len(filled) > 0:
+                slot = rng.choice(filled)
+                removed = inventory.removeItem(slot)
+                assert removed is not None and removed.inventory is None
+                plain.items[slot] = None
+            if pools is not None:
+                pools.settle()
+            checkSame(inventory, plain)
+
+
+def test_saveRoundTripDropsEmptyStacks():
+    inventory = Inventory(4)
+    inventory.addItems(ITEM_TYPES[2], 7)
+    game = SimpleNamespace(item_types={item_type.id: item_type for item_type in ITEM_TYPES})
+    data = inventory.toDict()
+    data["items"].append({"type": "item1", "stack": 0})
+    loaded = Inventory.fromDict(data, game)
+    assert [None if item is None else item.stack for item in loaded.items] == [5, 2, None, None, None]
+    assert loaded.addItems(ITEM_TYPES[2], 4) == 4
+    assert [None if item is None else item.stack for item in loaded.items] == [5, 5, 1, None, None]
+
+
+def test_cloneCopiesItemsIntoTheNewInventory():
+    inventory = Inventory(3)
+    inventory.addItems(ITEM_TYPES[1], 4)
+    clone = inventory.clone()
+    assert all(isinstance(item, ItemInstance) and item.inventory is clone for item in clone.items if item is not None)
+    clone.items[0].changeStack(-3) # pyright: ignore
+    assert inventory.items[0].stack == 3 # pyright: ignore
+    assert clone.items[0] is None